@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''Measures the overhead of the progressbar in hot loops
+
+Every benchmark reports the time per operation (an update, an iteration or
+a widget call) and the overhead compared to a bare loop. The results can be
+written to a JSON file and compared with the results of another version:
+
+    python benchmarks.py --output new.json --compare old.json
+
+All benchmarks run twice, once with the normal clock and once with a fake
+clock which advances a full second on every call. With the normal clock
+most updates are throttled so it shows the cost of the hot path, the fake
+clock makes every update redraw so it shows the cost of rendering.
+'''
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import json
+import argparse
+import platform
+import collections
+
+import progressbar
+from progressbar import utils
+
+benchmarks = collections.OrderedDict()
+
+# The real clock, `utils.clock` might be replaced by the `FakeClock`
+timer = utils.clock
+
+
+def benchmark(fn):
+    '''Register a benchmark, it's called with the number of operations'''
+    benchmarks[fn.__name__] = fn
+    return fn
+
+
+class NullFd(object):
+    '''File which discards everything but acts like a terminal'''
+
+    def write(self, value):
+        pass
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return True
+
+
+class FakeClock(object):
+    '''Replaces `utils.clock` with a clock that advances `step` seconds on
+    every call so the progressbar never throttles updates'''
+
+    def __init__(self, step=1.):
+        self.step = step
+        self.now = 0.
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+    def __enter__(self):
+        self.original = utils.clock
+        utils.clock = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        utils.clock = self.original
+
+
+def create_bar(bar_class=progressbar.ProgressBar, **kwargs):
+    kwargs.setdefault('fd', NullFd())
+    kwargs.setdefault('term_width', 80)
+    return bar_class(**kwargs)
+
+
+def run_updates(n, **kwargs):
+    kwargs.setdefault('max_value', n)
+    bar = create_bar(**kwargs).start()
+    for i in range(n):
+        bar.update(i)
+    bar.finish()
+
+
+@benchmark
+def bare_loop(n):
+    for i in range(n):
+        pass
+
+
+@benchmark
+def create(n):
+    for i in range(n):
+        progressbar.ProgressBar(fd=NullFd())
+
+
+@benchmark
+def update_default_widgets(n):
+    run_updates(n)
+
+
+@benchmark
+def update_unknown_length(n):
+    run_updates(n, max_value=progressbar.UnknownLength)
+
+
+@benchmark
+def update_data_transfer_bar(n):
+    run_updates(n, bar_class=progressbar.DataTransferBar)
+
+
+@benchmark
+def update_template(n):
+    run_updates(n, widgets=progressbar.Template(
+        '{percentage:3.0f}% {bar} {adaptive_eta}'))
+
+
+@benchmark
+def update_json_events(n):
+    run_updates(n, bar_class=progressbar.JsonEventBar)
+
+
+@benchmark
+def update_null_backend(n):
+    run_updates(n, backend=progressbar.NullBackend())
+
+
+@benchmark
+def update_redirect_stdout(n):
+    run_updates(n, redirect_stdout=True)
+
+
+@benchmark
+def update_redirect_stderr(n):
+    run_updates(n, redirect_stderr=True)
+
+
+@benchmark
+def increment(n):
+    bar = create_bar(max_value=n).start()
+    for i in range(n):
+        bar += 1
+    bar.finish()
+
+
+@benchmark
+def iterate(n):
+    bar = create_bar()
+    for i in bar(range(n)):
+        pass
+
+
+@benchmark
+def iterate_disabled(n):
+    bar = create_bar(disabled=True)
+    for i in bar(range(n)):
+        pass
+
+
+@benchmark
+def iterate_time_items(n):
+    bar = create_bar(time_items=True)
+    for i in bar(range(n)):
+        pass
+
+
+@benchmark
+def iterate_unknown_length(n):
+    bar = create_bar()
+    for i in bar(iter(range(n))):
+        pass
+
+
+@benchmark
+def format_widgets(n):
+    bar = create_bar(max_value=n).start()
+    for i in range(n):
+        bar.value = i
+        bar._format_widgets()
+    bar.finish()
+
+
+def widget_benchmark(name, widget):
+    def run_widget(n):
+        bar = create_bar(max_value=n, widgets=[widget]).start()
+        if isinstance(widget, progressbar.widgets.AutoWidthWidgetBase):
+            for i in range(n):
+                bar.value = i
+                widget(bar, bar.data(), 80)
+        else:
+            for i in range(n):
+                bar.value = i
+                widget(bar, bar.data())
+
+    run_widget.__name__ = name
+    benchmark(run_widget)
+
+
+widget_benchmark('widget_data', progressbar.FormatLabel(''))
+for widget in (
+        progressbar.Timer(),
+        progressbar.ETA(),
+        progressbar.AdaptiveETA(),
+        progressbar.AbsoluteETA(),
+        progressbar.DataSize(),
+        progressbar.FileTransferSpeed(),
+        progressbar.AdaptiveTransferSpeed(),
+        progressbar.AnimatedMarker(),
+        progressbar.Counter(),
+        progressbar.Percentage(),
+        progressbar.SimpleProgress(),
+        progressbar.Bar(),
+        progressbar.BouncingBar(),
+        progressbar.SmoothBar(),
+        progressbar.Sparkline()):
+    widget_benchmark('widget_' + widget.__class__.__name__, widget)
+
+
+def measure(fn, n, repeat):
+    '''Returns the best time in nanoseconds per operation'''
+    best = None
+    for _ in range(repeat):
+        start = timer()
+        fn(n)
+        duration = timer() - start
+        if best is None or duration < best:
+            best = duration
+    return best * 1e9 / n
+
+
+def run(n, repeat, names=None):
+    results = collections.OrderedDict()
+    for clock in ('real', 'fake'):
+        baseline = None
+        for name, fn in benchmarks.items():
+            if names and name != 'bare_loop' and name not in names:
+                continue
+
+            # Only the measurement itself should use the fake clock
+            if clock == 'fake':
+                with FakeClock():
+                    ns = measure(fn, n, repeat)
+            else:
+                ns = measure(fn, n, repeat)
+
+            if baseline is None:
+                baseline = ns
+
+            key = '%s/%s' % (name, clock)
+            results[key] = dict(ns=ns, overhead_ns=ns - baseline)
+            print('%-40s %12.1f ns %12.1f ns overhead' % (
+                key, ns, ns - baseline))
+
+    return results
+
+
+def compare(results, previous):
+    print()
+    print('%-40s %12s %12s %8s' % ('benchmark', 'previous', 'current',
+                                   'ratio'))
+    for key, result in results.items():
+        if key not in previous:
+            continue
+
+        old = previous[key]['overhead_ns']
+        new = result['overhead_ns']
+        ratio = new / old if old > 0 else float('nan')
+        print('%-40s %12.1f %12.1f %8.2f' % (key, old, new, ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help='the benchmarks to run, defaults to all')
+    parser.add_argument('-n', '--iterations', type=int, default=100000,
+                        help='the number of operations per benchmark')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='the number of runs, the best is reported')
+    parser.add_argument('-o', '--output',
+                        help='write the results as JSON to this file')
+    parser.add_argument('-c', '--compare',
+                        help='compare with the results in this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.repeat, args.names)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(dict(
+                version=progressbar.__version__,
+                python=platform.python_version(),
+                implementation=platform.python_implementation(),
+                iterations=args.iterations,
+                results=results,
+            ), fh, indent=4)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(results, json.load(fh)['results'])
+
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -509,6 +509,20 @@ def percentage_on_generators():
         sleep(0.02)
 
 
+@example
+def multi_bar_example():
+    with progressbar.MultiBar() as multi:
+        bars = [multi.add(progressbar.ProgressBar(max_value=20 * (i + 1)))
+                for i in range(4)]
+        for i in range(80):
+            sleep(0.02)
+            for bar in bars:
+                if bar.value < bar.max_value:
+                    bar += 1
+                    if bar.value == bar.max_value:
+                        bar.finish()
+
+
 def test(*tests):
     for example in examples:
         if not tests or example.__name__ in tests:
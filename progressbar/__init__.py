@@ -8,14 +8,17 @@ from progressbar.widgets import (
     DataSize,
     FileTransferSpeed,
     AdaptiveTransferSpeed,
+    ItemLatency,
     AnimatedMarker,
     Counter,
     Percentage,
     FormatLabel,
     SimpleProgress,
     Bar,
+    SmoothBar,
     ReverseBar,
     BouncingBar,
+    Sparkline,
     RotatingMarker,
     DynamicMessage,
     FormatCustomText
@@ -26,7 +29,23 @@ from .bar import (
     DataTransferBar,
     NullBar,
 )
+from .multi import MultiBar
+from .events import JsonEventBar
+from .backends import (
+    TerminalBackend,
+    LogBackend,
+    JsonBackend,
+    NullBackend,
+    MemoryBackend,
+)
 from .base import UnknownLength
+from .estimators import (
+    TimeWindowEstimator,
+    EWMAEstimator,
+    LinearRegressionEstimator,
+)
+from .shared import SharedCounter
+from .templates import Template
 
 
 from .__about__ import (
@@ -43,14 +62,17 @@ __all__ = [
     'DataSize',
     'FileTransferSpeed',
     'AdaptiveTransferSpeed',
+    'ItemLatency',
     'AnimatedMarker',
     'Counter',
     'Percentage',
     'FormatLabel',
     'SimpleProgress',
     'Bar',
+    'SmoothBar',
     'ReverseBar',
     'BouncingBar',
+    'Sparkline',
     'UnknownLength',
     'ProgressBar',
     'DataTransferBar',
@@ -58,6 +80,18 @@ __all__ = [
     'DynamicMessage',
     'FormatCustomText',
     'NullBar',
+    'MultiBar',
+    'JsonEventBar',
+    'TerminalBackend',
+    'LogBackend',
+    'JsonBackend',
+    'NullBackend',
+    'MemoryBackend',
+    'SharedCounter',
+    'Template',
+    'TimeWindowEstimator',
+    'EWMAEstimator',
+    'LinearRegressionEstimator',
     '__author__',
     '__version__',
 ]
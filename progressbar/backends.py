@@ -0,0 +1,231 @@
+'''Backends decide when and how the frames of a progressbar are shown
+
+A progressbar renders through its `backend`. The backend is called for
+every frame which passes the throttling of the progressbar and decides
+whether and how to write it:
+
+>>> from progressbar import bar
+>>> backend = MemoryBackend()
+>>> progress = bar.ProgressBar(
+...     backend=backend, widgets=['Value: ', bar.widgets.Counter()])
+>>> for i in progress(range(10)):
+...     pass
+>>> str(backend.lines[-1].rstrip())
+'Value: 10'
+'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import sys
+import json
+import datetime
+
+from python_utils import converters
+
+from . import utils
+
+
+class Backend(object):
+    '''The base class for all backends, every method receives the
+    progressbar. Backends keep track of what they have shown so every
+    progressbar needs its own backend.'''
+
+    #: Whether the frames are redrawn in place so the terminal size matters
+    interactive = False
+    #: Whether frames have to be rendered at all, progressbars only store
+    #: their value if not
+    renders = True
+
+    def start(self, progress):
+        '''Called when the progressbar has started, after the initial frame
+        unless that was throttled'''
+
+    def update(self, progress):
+        '''Called for every frame which isn't skipped by the throttling of
+        the progressbar'''
+
+    def clear(self, progress):
+        '''Called before redirected output is written to the same stream'''
+
+    def failure(self, progress, exc_type, exc_value):
+        '''Called when the `with` block of the progressbar raised, before
+        `finish()`'''
+
+    def finish(self, progress):
+        '''Called when the progressbar is finished'''
+
+
+class TerminalBackend(Backend):
+    '''Redraws the line of the progressbar in place on a terminal'''
+
+    interactive = True
+
+    def __init__(self, fd=sys.stderr):
+        self.fd = fd
+        # The last line written, `None` if the line has to be redrawn
+        self.last_line = None
+
+    def update(self, progress):
+        line = converters.to_unicode('\r' + progress._format_line())
+
+        # Writing (and flushing) an identical line is a waste of bandwidth
+        if line != self.last_line:
+            self.last_line = line
+            self.fd.write(line)
+            self.fd.flush()
+
+    def clear(self, progress):
+        self.fd.write('\r' + ' ' * progress.term_width + '\r')
+        self.last_line = None
+
+    def finish(self, progress):
+        self.fd.write('\n')
+        self.fd.flush()
+        self.last_line = None
+
+
+class LogBackend(Backend):
+    '''Writes a separate line every `interval` seconds and every
+    `milestone` percent, for files and pipes like log files and CI output'''
+
+    def __init__(self, fd=sys.stderr, interval=60, milestone=10):
+        self.fd = fd
+        self.interval = interval
+        self.milestone = milestone
+        # The time and milestone of the last line
+        self.last_time = None
+        self.last_milestone = None
+
+    def update(self, progress):
+        if progress._end_time is not None:
+            # The final line is written by `finish()`
+            return
+
+        now = utils.clock()
+        percentage = progress.percentage
+        if percentage is None or not self.milestone:
+            milestone = None
+        else:
+            milestone = int(percentage // self.milestone)
+
+        if self.last_time is None or milestone != self.last_milestone \
+                or now - self.last_time >= self.interval:
+            self.last_time = now
+            self.last_milestone = milestone
+            self.write_line(progress)
+
+    def write_line(self, progress):
+        self.fd.write(converters.to_unicode(
+            progress._format_line().rstrip() + '\n'))
+        self.fd.flush()
+
+    def finish(self, progress):
+        self.write_line(progress)
+        self.last_time = None
+
+
+def json_default(value):
+    '''Converts the values of the progressbar data which `json` can't
+    serialize, unknown values (like `UnknownLength`) become `null`'''
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    elif isinstance(value, datetime.timedelta):
+        return utils.timedelta_to_seconds(value)
+    else:
+        return None
+
+
+class JsonBackend(Backend):
+    '''Writes a JSON object per line for every event instead of drawing
+
+    The events are `start`, `progress`, `finish` and `failure`. Every event
+    has the variables of `data()` with the `rate` (value per second) and
+    `eta` (seconds) added. The fd is only flushed every `flush_interval`
+    seconds for progress events.
+    '''
+
+    def __init__(self, fd=sys.stderr, flush_interval=1.):
+        self.fd = fd
+        self.flush_interval = flush_interval
+        self.flush_time = None
+        self.started = False
+        self.failed = False
+
+    def event(self, progress, name, **fields):
+        'Returns the event with all the data of the progressbar'
+        data = progress.data().materialize()
+        event = dict(data, event=name, **fields)
+        del event['dynamic_messages']
+        event.update(progress.dynamic_messages)
+        event['time'] = utils.timestamp(data['last_update_time'])
+
+        elapsed = data['total_seconds_elapsed']
+        try:
+            event['rate'] = (progress.value - progress.min_value) / elapsed
+        except (TypeError, ZeroDivisionError):
+            event['rate'] = None
+
+        try:
+            event['eta'] = (progress.max_value - progress.value) \
+                / event['rate']
+        except (TypeError, ZeroDivisionError):
+            event['eta'] = None
+
+        return event
+
+    def write_event(self, progress, name, flush=True, **fields):
+        event = self.event(progress, name, **fields)
+        self.fd.write(converters.to_unicode(json.dumps(
+            event, default=json_default, sort_keys=True,
+            separators=(',', ':'))) + '\n')
+
+        now = progress._last_update_time
+        if flush or self.flush_time is None \
+                or now - self.flush_time >= self.flush_interval:
+            self.flush_time = now
+            self.fd.flush()
+
+    def start(self, progress):
+        if not self.started:
+            self.started = True
+            self.write_event(progress, 'start')
+
+    def update(self, progress):
+        # The first frame is the initial update by `start()`
+        if not self.started:
+            self.start(progress)
+        elif progress._end_time is None:
+            self.write_event(progress, 'progress', flush=False)
+
+    def failure(self, progress, exc_type, exc_value):
+        self.failed = True
+        self.write_event(progress, 'failure', error='%s: %s' % (
+            exc_type.__name__, exc_value))
+
+    def finish(self, progress):
+        if not self.failed:
+            self.write_event(progress, 'finish')
+        self.started = self.failed = False
+
+
+class NullBackend(Backend):
+    '''Shows nothing, progressbars with this backend only store their
+    value'''
+
+    renders = False
+
+
+class MemoryBackend(Backend):
+    '''Keeps the rendered lines in `lines`, useful for testing'''
+
+    def __init__(self):
+        self.lines = []
+        self.finished = False
+
+    def update(self, progress):
+        self.lines.append(progress._format_line())
+
+    def finish(self, progress):
+        self.lines.append(progress._format_line())
+        self.finished = True
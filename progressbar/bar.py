@@ -4,12 +4,13 @@ from __future__ import unicode_literals
 from __future__ import with_statement
 
 import io
+import os
 import sys
 import math
-import time
 import logging
 import warnings
-from datetime import datetime, timedelta
+import threading
+from datetime import timedelta
 import collections
 
 from python_utils import converters
@@ -19,11 +20,30 @@ from . import widgets as widgets_module  # Avoid name collision
 from . import six
 from . import utils
 from . import base
+from . import backends
+from . import shared
+from . import templates
 
 
 logger = logging.getLogger()
 
 
+def is_terminal(fd):
+    '''Returns whether the fd is an interactive terminal, file-like objects
+    without `isatty()` are assumed to be terminals
+
+    >>> is_terminal(io.StringIO())
+    False
+    '''
+    try:
+        return fd.isatty()
+    except AttributeError:
+        return True
+    except ValueError:  # pragma: no cover
+        # Closed files
+        return False
+
+
 class ProgressBarMixinBase(object):
 
     def __init__(self, **kwargs):
@@ -43,21 +63,334 @@ class ProgressBarBase(collections.Iterable, ProgressBarMixinBase):
     pass
 
 
+class RenderThread(threading.Thread):
+    '''Daemon thread which calls `render` every `interval` seconds until
+    `stop()` is called'''
+
+    def __init__(self, render, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.render = render
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.render()
+
+    def stop(self):
+        '''Stop rendering and wait for the current frame to finish'''
+        self.stopped.set()
+        if threading.current_thread() is not self:
+            self.join()
+
+
+def _declaring_class(cls, name):
+    'Returns the class in the mro of `cls` which defines the attribute'
+    for base_class in cls.__mro__:
+        if name in vars(base_class):
+            return base_class
+
+
+class RenderPlan(object):
+    '''The widgets of a progressbar compiled for rendering
+
+    The static strings are converted and measured only once so rendering a
+    frame only needs to call the actual widgets. Widgets which declare their
+    `depends` are only called when those inputs changed, otherwise their
+    previous output is reused. The plan is only valid for the given
+    `widgets` list and `term_width`.
+    '''
+
+    #: The inputs widgets can declare in their `depends`
+    inputs = dict(
+        value=lambda progress, data: data['value'],
+        max_value=lambda progress, data: data['max_value'],
+        percentage=lambda progress, data: data['percentage'],
+        elapsed=lambda progress, data: data['total_seconds_elapsed'],
+        finished=lambda progress, data: progress._end_time is not None,
+        term_width=lambda progress, data: progress.term_width,
+        dynamic_messages=lambda progress, data: tuple(sorted(
+            progress.dynamic_messages.items())),
+    )
+
+    def __init__(self, widgets, term_width):
+        self.widgets = widgets
+        self.term_width = term_width
+
+        # The output of a frame with the static strings filled in
+        self.template = []
+        # The (index, widget) pairs of the fixed and auto width widgets
+        self.fixed = []
+        self.expanding = []
+        # The width which remains after the static strings
+        self.width = term_width
+        # The highest number of steps a single character can show
+        self.resolution = 1
+        # The (input, granularity) pairs per widget index for the widgets
+        # with usable `depends` and their last (key, output)
+        self.depends = {}
+        self.cache = {}
+
+        for index, widget in enumerate(widgets):
+            if isinstance(widget, widgets_module.AutoWidthWidgetBase):
+                self.template.append(None)
+                self.expanding.append((index, widget))
+                self.resolution = max(
+                    self.resolution, getattr(widget, 'resolution', 1))
+            elif isinstance(widget, six.basestring):
+                widget = converters.to_unicode(widget)
+                self.template.append(widget)
+                self.width -= len(widget)
+                continue
+            else:
+                self.template.append(None)
+                self.fixed.append((index, widget))
+
+            depends = self._compile_depends(widget)
+            if depends is not None:
+                self.depends[index] = depends
+
+    def _compile_depends(self, widget):
+        depends = getattr(widget, 'depends', None)
+        if depends is None:
+            return None
+
+        # Subclasses which override `__call__` have to declare their
+        # `depends` again, the inherited ones might not apply anymore
+        depends_class = _declaring_class(type(widget), 'depends')
+        call_class = _declaring_class(type(widget), '__call__')
+        if call_class not in depends_class.__mro__:
+            return None
+
+        # A custom format could use any other variable
+        format = getattr(widget, 'format', None)
+        if format is not None and format != getattr(
+                widget, 'DEFAULT_FORMAT', None):
+            return None
+
+        compiled = []
+        for name in depends:
+            if isinstance(name, tuple):
+                name, granularity = name
+            else:
+                granularity = None
+
+            if name not in self.inputs:
+                return None
+            compiled.append((self.inputs[name], granularity))
+        return compiled
+
+    def _call(self, index, widget, progress, data, *args):
+        '''Calls the widget or returns the cached output if the inputs of
+        the widget are unchanged'''
+        depends = self.depends.get(index)
+        if depends is None:
+            return converters.to_unicode(widget(progress, data, *args))
+
+        key = list(args)
+        for get_input, granularity in depends:
+            value = get_input(progress, data)
+            if granularity:
+                # Empty values are kept apart, widgets often show them as N/A
+                value = value // granularity if value else None
+            key.append(value)
+
+        cached = self.cache.get(index)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        output = converters.to_unicode(widget(progress, data, *args))
+        self.cache[index] = key, output
+        return output
+
+    def render(self, progress, data):
+        '''Render all widgets and return the list of outputs'''
+        result = self.template[:]
+        width = self.width
+
+        for index, widget in self.fixed:
+            widget_output = self._call(index, widget, progress, data)
+            result[index] = widget_output
+            width -= len(widget_output)
+
+        count = len(self.expanding)
+        for index, widget in self.expanding:
+            portion = max(int(math.ceil(width * 1. / count)), 0)
+            count -= 1
+
+            widget_output = self._call(index, widget, progress, data, portion)
+            width -= len(widget_output)
+            result[index] = widget_output
+
+        return result
+
+
+class ProgressData(dict):
+    '''The variables available to the widgets for a single frame
+
+    The cheap variables are stored directly, the others are only calculated
+    when a widget asks for them and are cached for the rest of the frame.
+    This is a regular `dict` otherwise so it can be used with `%` style
+    format strings.
+    '''
+
+    #: The variables which are stored directly
+    eager_keys = (
+        'max_value',
+        'value',
+        'previous_value',
+        'updates',
+        'dynamic_messages',
+    )
+
+    #: The variables which are calculated on first access
+    lazy_keys = (
+        'start_time',
+        'last_update_time',
+        'end_time',
+        'total_seconds_elapsed',
+        'seconds_elapsed',
+        'minutes_elapsed',
+        'hours_elapsed',
+        'days_elapsed',
+        'time_elapsed',
+        'percentage',
+    )
+
+    def __init__(self, progress):
+        dict.__init__(
+            self,
+            # The maximum value (can be None with iterators)
+            max_value=progress.max_value,
+            # The current value
+            value=progress.value,
+            # The previous value
+            previous_value=progress.previous_value,
+            # The total update count
+            updates=progress.updates,
+            # Dictionary of DynamicMessage's
+            dynamic_messages=progress.dynamic_messages,
+        )
+        self.progress = progress
+        self.now = progress._last_update_time
+
+    def __missing__(self, key):
+        if key not in self.lazy_keys:
+            raise KeyError(key)
+
+        value = self[key] = getattr(self, '_get_' + key)()
+        return value
+
+    def _get_start_time(self):
+        # Start time of the widget
+        return self.progress.start_time
+
+    def _get_last_update_time(self):
+        # Last update time of the widget
+        return utils.clock_to_datetime(self.now)
+
+    def _get_end_time(self):
+        # End time of the widget
+        return self.progress.end_time
+
+    def _get_total_seconds_elapsed(self):
+        # The seconds since the bar started
+        return self.now - self.progress._start_time
+
+    def _get_seconds_elapsed(self):
+        # The seconds since the bar started modulo 60
+        elapsed = self['time_elapsed']
+        return (elapsed.seconds % 60) + (elapsed.microseconds / 1000000.)
+
+    def _get_minutes_elapsed(self):
+        # The minutes since the bar started modulo 60
+        return (self['time_elapsed'].seconds / 60) % 60
+
+    def _get_hours_elapsed(self):
+        # The hours since the bar started modulo 24
+        return (self['time_elapsed'].seconds / (60 * 60)) % 24
+
+    def _get_days_elapsed(self):
+        # The hours since the bar started
+        return self['time_elapsed'].seconds / (60 * 60 * 24)
+
+    def _get_time_elapsed(self):
+        # The raw elapsed `datetime.timedelta` object
+        return timedelta(seconds=self['total_seconds_elapsed'])
+
+    def _get_percentage(self):
+        # Percentage as a float or `None` if no max_value is available
+        return self.progress.percentage
+
+    def materialize(self):
+        '''Calculate all lazy variables so they are stored in the dict'''
+        for key in self.lazy_keys:
+            self[key]
+        return self
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.lazy_keys
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self):
+        return dict(self.materialize())
+
+    def __iter__(self):
+        return dict.__iter__(self.materialize())
+
+    def __len__(self):
+        return dict.__len__(self.materialize())
+
+    def __repr__(self):
+        return dict.__repr__(self.materialize())
+
+    def keys(self):
+        return dict.keys(self.materialize())
+
+    def values(self):
+        return dict.values(self.materialize())
+
+    def items(self):
+        return dict.items(self.materialize())
+
+
 class DefaultFdMixin(ProgressBarMixinBase):
 
-    def __init__(self, fd=sys.stderr, **kwargs):
+    def __init__(self, fd=sys.stderr, line_mode=None, line_interval=60,
+                 line_milestone=10, backend=None, **kwargs):
         self.fd = fd
+        if backend is None:
+            # Files and pipes (log files, CI output) get a separate line now
+            # and then instead of a redrawn line
+            if line_mode is None:
+                line_mode = not is_terminal(fd)
+
+            if line_mode:
+                backend = backends.LogBackend(
+                    fd, interval=line_interval, milestone=line_milestone)
+            else:
+                backend = backends.TerminalBackend(fd)
+
+        self.backend = backend
+        self.line_mode = not backend.interactive
+        # Forked child processes should leave the fd to the parent
+        self._pid = os.getpid()
         ProgressBarMixinBase.__init__(self, **kwargs)
 
     def update(self, *args, **kwargs):
         ProgressBarMixinBase.update(self, *args, **kwargs)
-        line = converters.to_unicode('\r' + self._format_line())
-        self.fd.write(line)
+        self.backend.update(self)
 
     def finish(self, *args, **kwargs):  # pragma: no cover
         ProgressBarMixinBase.finish(self, *args, **kwargs)
-        self.fd.write('\n')
-        self.fd.flush()
+        if self._pid == os.getpid():
+            self.backend.finish(self)
 
 
 class ResizableMixin(ProgressBarMixinBase):
@@ -71,6 +404,11 @@ class ResizableMixin(ProgressBarMixinBase):
         else:
             try:
                 self._handle_resize()
+                # Only redrawn lines have to follow the terminal size
+                if not getattr(self, 'backend', None) or \
+                        not self.backend.interactive:
+                    return
+
                 import signal
                 self._prev_handle = signal.getsignal(signal.SIGWINCH)
                 signal.signal(signal.SIGWINCH, self._handle_resize)
@@ -81,9 +419,15 @@ class ResizableMixin(ProgressBarMixinBase):
     def _handle_resize(self, signum=None, frame=None):
         'Tries to catch resize signals sent from the terminal.'
 
-        w, h = utils.get_terminal_size()
+        # Only an actual resize makes the cached size outdated
+        w, h = utils.get_terminal_size(
+            getattr(self, 'fd', None), refresh=signum is not None)
         self.term_width = w
 
+    # Refreshes the cached terminal sizes while it replaces the handler of
+    # `utils.get_terminal_size()`
+    _handle_resize.clears_terminal_sizes = True
+
     def finish(self):  # pragma: no cover
         ProgressBarMixinBase.finish(self)
         if self.signal_set:
@@ -114,10 +458,15 @@ class StdRedirectMixin(DefaultFdMixin):
 
         DefaultFdMixin.start(self, *args, **kwargs)
 
+    def _clear_line(self):
+        '''Clears the line of the bar so redirected output can be written,
+        if the backend has one'''
+        self.backend.clear(self)
+
     def update(self, value=None):
         try:
             if self.redirect_stderr and sys.stderr.tell():
-                self.fd.write('\r' + ' ' * self.term_width + '\r')
+                self._clear_line()
 
                 # Not atomic unfortunately, but writing to the same stream
                 # from multiple threads is a bad idea anyhow
@@ -133,7 +482,7 @@ class StdRedirectMixin(DefaultFdMixin):
 
         try:
             if self.redirect_stdout and sys.stdout.tell():
-                self.fd.write('\r' + ' ' * self.term_width + '\r')
+                self._clear_line()
 
                 # Not atomic unfortunately, but writing to the same stream
                 # from multiple threads is a bad idea anyhow
@@ -151,7 +500,10 @@ class StdRedirectMixin(DefaultFdMixin):
 
     def finish(self):
         DefaultFdMixin.finish(self)
+        self._finish_redirect()
 
+    def _finish_redirect(self):
+        'Writes the redirected output and restores stdout and stderr'
         if self.redirect_stderr and hasattr(sys.stderr, 'getvalue'):
             self._stderr.write(sys.stderr.getvalue())
             self.stderr = sys.stderr = self._stderr
@@ -210,11 +562,17 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
 
     _DEFAULT_MAXVAL = 100
     _MINIMUM_UPDATE_INTERVAL = 0.05  # update up to a 20 times per second
+    # The clock is checked every this many items of a stride when iterating,
+    # so a slowdown after a fast phase still gets its redraws
+    _STRIDE_CHECK_ITEMS = 16
+    # Setting this environment variable to a true value disables all bars
+    # which don't explicitly pass `disabled`
+    _DISABLE_ENVIRON = 'PROGRESSBAR_DISABLE'
 
     def __init__(self, min_value=0, max_value=None, widgets=None,
                  left_justify=True, initial_value=0, poll_interval=None,
-                 widget_kwargs=None,
-                 **kwargs):
+                 widget_kwargs=None, threaded=False, thread_safe=False,
+                 time_items=False, disabled=None, **kwargs):
         '''
         Initializes a progress bar with sane defaults
 
@@ -223,7 +581,8 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
             max_value (int): The maximum/end value for the progress bar.
                              Defaults to `_DEFAULT_MAXVAL`
             widgets (list): The widgets to render, defaults to the result of
-                            `default_widget()`
+                            `default_widget()`. A `templates.Template` can
+                            be given instead of a list.
             left_justify (bool): Justify to the left if `True` or the right if
                                  `False`
             initial_value (int): The value to start with
@@ -231,7 +590,42 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
                                    is always limited by
                                    `_MINIMUM_UPDATE_INTERVAL`
             widget_kwargs (dict): The default keyword arguments for widgets
+            threaded (bool): Redraw the bar from a background thread every
+                             `_MINIMUM_UPDATE_INTERVAL` seconds. This makes
+                             `update()` only store the value (without range
+                             checks) and keeps time sensitive widgets
+                             animating while the caller is busy. Make sure
+                             to call `finish()` to stop the thread.
+            thread_safe (bool): Allow updating the bar from multiple threads.
+                                Every thread adds to its own counter with
+                                `+=` without locking, the counters are
+                                combined when the bar is rendered.
+            time_items (bool): Measure the time between consecutive items
+                               when iterating, see `latencies` and
+                               `latency_summary()`
+            backend (backends.Backend): Decides when and how the bar is
+                                        shown, defaults to a
+                                        `backends.TerminalBackend` for
+                                        terminals and a
+                                        `backends.LogBackend` otherwise
+            disabled (bool): Show nothing at all, iterating returns the
+                             iterator of the iterable itself and `start()`,
+                             `update()` and `finish()` do nothing. Defaults
+                             to the `PROGRESSBAR_DISABLE` environment
+                             variable unless a `backend` is given.
         '''
+        if disabled is None:
+            # An explicit backend (like the JSON events) is never disabled
+            # by the environment
+            environ = os.environ.get(self._DISABLE_ENVIRON, '').lower()
+            disabled = kwargs.get('backend') is None and \
+                environ in ('1', 'true', 'yes', 'on')
+        self.disabled = disabled
+        if disabled:
+            # Nothing is shown so the terminal doesn't have to be probed
+            kwargs['backend'] = backends.NullBackend()
+            kwargs['term_width'] = kwargs.get('term_width') or 80
+
         StdRedirectMixin.__init__(self, **kwargs)
         ResizableMixin.__init__(self, **kwargs)
         ProgressBarBase.__init__(self, **kwargs)
@@ -254,18 +648,37 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
         self.widgets = widgets
         self.widget_kwargs = widget_kwargs or {}
         self.left_justify = left_justify
+        self.threaded = threaded
+        self._render_thread = None
+        # The `MultiBar` this bar is rendered by, if any
+        self._manager = None
+        # When rendering is done elsewhere (or not at all) `update()` only
+        # stores the value
+        self._store_only = not self.backend.renders
+
+        self._render_plan = None
 
         self._iterable = None
         self.previous_value = None
         self.value = initial_value
-        self.last_update_time = None
-        self.start_time = None
+        # All internal timing is done using `utils.clock()` floats, the
+        # `datetime` versions are only generated when requested
+        self._last_update_time = None
+        self._start_time = None
+        self._end_time = None
         self.updates = 0
-        self.end_time = None
         self.extra = dict()
 
-        if poll_interval and isinstance(poll_interval, (int, float)):
-            poll_interval = timedelta(seconds=poll_interval)
+        self._lock = None
+        if thread_safe:
+            self._init_shards()
+
+        # The time between consecutive items when iterating with
+        # `time_items` enabled
+        self.latencies = None
+        self._item_time = None
+        if time_items:
+            self.latencies = utils.QuantileSketch()
 
         # Note that the _MINIMUM_UPDATE_INTERVAL sets the minimum in case of
         # low values.
@@ -277,6 +690,14 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
             if isinstance(widget, widgets_module.DynamicMessage):
                 self.dynamic_messages[widget.name] = None
 
+        if disabled:
+            # Bound once so the calls skip all checks
+            self.start = self.update = self.finish = self._disabled
+
+    def _disabled(self, *args, **kwargs):
+        'Replaces `start()`, `update()` and `finish()` of disabled bars'
+        return self
+
     @property
     def percentage(self):
         '''Return current percentage, returns None if no max_value is given
@@ -321,17 +742,40 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
         return percentage * 100
 
     def get_last_update_time(self):
-        if self._last_update_time:
-            return datetime.fromtimestamp(self._last_update_time)
+        return utils.clock_to_datetime(self._last_update_time)
 
     def set_last_update_time(self, value):
-        if value:
-            self._last_update_time = time.mktime(value.timetuple())
-        else:
-            self._last_update_time = None
+        self._last_update_time = utils.datetime_to_clock(value)
 
     last_update_time = property(get_last_update_time, set_last_update_time)
 
+    def get_start_time(self):
+        return utils.clock_to_datetime(self._start_time)
+
+    def set_start_time(self, value):
+        self._start_time = utils.datetime_to_clock(value)
+
+    start_time = property(get_start_time, set_start_time)
+
+    def get_end_time(self):
+        return utils.clock_to_datetime(self._end_time)
+
+    def set_end_time(self, value):
+        self._end_time = utils.datetime_to_clock(value)
+
+    end_time = property(get_end_time, set_end_time)
+
+    def get_poll_interval(self):
+        if self._poll_interval:
+            return timedelta(seconds=self._poll_interval)
+
+    def set_poll_interval(self, value):
+        if isinstance(value, timedelta):
+            value = utils.timedelta_to_seconds(value)
+        self._poll_interval = value or None
+
+    poll_interval = property(get_poll_interval, set_poll_interval)
+
     def data(self):
         '''
         Variables available:
@@ -346,45 +790,12 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
         including days
         - percentage: Percentage as a float
         - dynamic_messages: A dictionary of user-defined DynamicMessage's
+
+        The returned `ProgressData` only calculates the variables when they
+        are used.
         '''
-        self._last_update_time = time.time()
-        elapsed = self.last_update_time - self.start_time
-        # For Python 2.7 and higher we have _`timedelta.total_seconds`, but we
-        # want to support older versions as well
-        total_seconds_elapsed = utils.timedelta_to_seconds(elapsed)
-        return dict(
-            # The maximum value (can be None with iterators)
-            max_value=self.max_value,
-            # Start time of the widget
-            start_time=self.start_time,
-            # Last update time of the widget
-            last_update_time=self.last_update_time,
-            # End time of the widget
-            end_time=self.end_time,
-            # The current value
-            value=self.value,
-            # The previous value
-            previous_value=self.previous_value,
-            # The total update count
-            updates=self.updates,
-            # The seconds since the bar started
-            total_seconds_elapsed=total_seconds_elapsed,
-            # The seconds since the bar started modulo 60
-            seconds_elapsed=(elapsed.seconds % 60) +
-            (elapsed.microseconds / 1000000.),
-            # The minutes since the bar started modulo 60
-            minutes_elapsed=(elapsed.seconds / 60) % 60,
-            # The hours since the bar started modulo 24
-            hours_elapsed=(elapsed.seconds / (60 * 60)) % 24,
-            # The hours since the bar started
-            days_elapsed=(elapsed.seconds / (60 * 60 * 24)),
-            # The raw elapsed `datetime.timedelta` object
-            time_elapsed=elapsed,
-            # Percentage as a float or `None` if no max_value is available
-            percentage=self.percentage,
-            # Dictionary of DynamicMessage's
-            dynamic_messages=self.dynamic_messages
-        )
+        self._last_update_time = utils.clock()
+        return ProgressData(self)
 
     def default_widgets(self):
         if self.max_value:
@@ -409,6 +820,10 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
 
     def __call__(self, iterable, max_value=None):
         'Use a ProgressBar to iterate through an iterable'
+        if self.disabled:
+            # No need to pass the items through `__next__()`
+            return iter(iterable)
+
         if max_value is None:
             try:
                 self.max_value = len(iterable)
@@ -427,16 +842,91 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
     def __next__(self):
         try:
             value = next(self._iterable)
-            if self.start_time is None:
+            if self.latencies is not None:
+                self._time_item()
+
+            if self._start_time is None:
                 self.start()
+            elif self.value + 1 < self._next_stride_value:
+                # Only count the item, the full update can wait
+                self.value += 1
             else:
-                self.update(self.value + 1)
+                self._stride_checkpoint(self.value + 1)
             return value
         except StopIteration:
             self.finish()
             raise
 
+    def _time_item(self):
+        now = utils.clock()
+        if self._item_time is not None:
+            self.latencies.add(now - self._item_time)
+        self._item_time = now
+
+    def latency_summary(self, quantiles=(50, 95, 99)):
+        '''Returns the number of timed items and the time per item in
+        seconds at the given percentiles, requires `time_items`
+
+        >>> progress = ProgressBar(time_items=True)
+        >>> for i in progress(range(3)):
+        ...     pass
+        >>> sorted(progress.latency_summary())
+        ['count', 'p50', 'p95', 'p99']
+        '''
+        summary = dict(count=len(self.latencies or ()))
+        for quantile in quantiles:
+            if self.latencies:
+                summary['p%d' % quantile] = self.latencies.quantile(
+                    quantile / 100)
+            else:
+                summary['p%d' % quantile] = None
+        return summary
+
+    def _stride_checkpoint(self, value):
+        '''Called every `_STRIDE_CHECK_ITEMS` items of a stride, does the
+        full update when the stride is done or when the items became slow
+        enough to miss the next redraw'''
+        if value < self._stride_end and utils.clock() - self._stride_time \
+                < self._MINIMUM_UPDATE_INTERVAL:
+            self.value = value
+            self._next_stride_value = min(
+                value + self._STRIDE_CHECK_ITEMS, self._stride_end)
+            return
+
+        self.update(value)
+        self._adapt_stride()
+
+    def _adapt_stride(self):
+        '''Calculates after how many items `__next__` should do a full update
+        again based on the measured item throughput. The aim is to do a few
+        full updates per `_MINIMUM_UPDATE_INTERVAL` so redraws are still on
+        time.'''
+        now = utils.clock()
+        elapsed = now - self._stride_time
+        # A stride ends early when the items slow down
+        items = max(self.value - self._stride_value, 1)
+        stride = self._stride * 2
+        if elapsed > 0:
+            # Never grow faster than doubling to cope with bursty iterables
+            stride = min(stride, int(
+                items * self._MINIMUM_UPDATE_INTERVAL / (elapsed * 4)))
+
+        self._stride = max(stride, 1)
+        self._stride_time = now
+        self._stride_value = self.value
+        self._stride_end = self.value + self._stride
+
+        # Make sure exceeding the max_value is still detected immediately
+        if self.max_value is not base.UnknownLength \
+                and self.max_value is not None:
+            self._stride_end = min(self._stride_end, self.max_value)
+
+        self._next_stride_value = min(
+            self.value + self._STRIDE_CHECK_ITEMS, self._stride_end)
+
     def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self._pid == os.getpid():
+            self.backend.failure(self, exc_type, exc_value)
         self.finish()
 
     def __enter__(self):
@@ -448,49 +938,106 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
 
     def __iadd__(self, value):
         'Updates the ProgressBar by adding a new value.'
-        self.update(self.value + value)
+        if self._lock is not None:
+            self._increment_shard(value)
+        elif not self._store_only:
+            self.update(self.value + value)
+        else:
+            self.value += value
         return self
 
-    def _format_widgets(self):
-        result = []
-        expanding = []
-        width = self.term_width
-        data = self.data()
-
-        for index, widget in enumerate(self.widgets):
-            if isinstance(widget, widgets.AutoWidthWidgetBase):
-                result.append(widget)
-                expanding.insert(0, index)
-            elif isinstance(widget, six.basestring):
-                result.append(widget)
-                width -= len(widget)
-            else:
-                widget_output = converters.to_unicode(widget(self, data))
-                result.append(widget_output)
-                width -= len(widget_output)
-
-        count = len(expanding)
-        while expanding:
-            portion = max(int(math.ceil(width * 1. / count)), 0)
-            index = expanding.pop()
-            widget = result[index]
-            count -= 1
-
-            widget_output = widget(self, data, portion)
-            width -= len(widget_output)
-            result[index] = widget_output
+    def _increment_shard(self, value):
+        '''Adds the value to the counter of the current thread and renders
+        if nobody else is rendering already'''
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0]
+            with self._lock:
+                self._shards.append(shard)
+
+        # Only the current thread writes to its own shard so no lock needed
+        shard[0] += value
+
+        if self._start_time is None:
+            # Like a regular bar the first addition starts the bar
+            render = True
+        else:
+            render = not self._store_only and utils.clock() - \
+                self._last_update_time >= self._MINIMUM_UPDATE_INTERVAL
+
+        if render:
+            # The lock is only tried so the other threads never wait
+            if self._lock.acquire(False):
+                try:
+                    self.update()
+                finally:
+                    self._lock.release()
+
+    def _init_shards(self):
+        'Sets up the per-thread and shared counters of the thread safe mode'
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # The per-thread counters, shared (process) counters and the value
+        # they are relative to
+        self._shards = []
+        self._shared_counters = []
+        self._shard_base = self.value
+
+    def shared_counter(self):
+        '''Creates a `shared.SharedCounter` which worker processes can add
+        to, its value is added to the bar whenever it is rendered. This
+        enables the `thread_safe` mode as well.
+
+        The counter can only be passed to a process when it is created, for
+        example through the `initargs` of a `multiprocessing.Pool`. Make
+        sure the bar is rendered regularly while the workers run by using
+        `threaded=True` or calling `update()`.
+        '''
+        if self._lock is None:
+            self._init_shards()
+
+        counter = shared.SharedCounter()
+        with self._lock:
+            self._shared_counters.append(counter)
+        return counter
+
+    def _merge_shards(self, value=None):
+        '''Returns the combined value of all thread counters or, if a value
+        is given, moves the base so the combined value matches it. Must be
+        called with the lock held.'''
+        total = sum(shard[0] for shard in self._shards)
+        for counter in self._shared_counters:
+            total += counter.value
+        if value is None or value is base.UnknownLength:
+            return self._shard_base + total
+        else:
+            self._shard_base = value - total
+            return value
 
-        return result
+    def _get_render_plan(self):
+        '''Returns the `RenderPlan` for the widgets, it is only recompiled
+        when the `widgets` or `term_width` attributes are changed. Note that
+        modifying the `widgets` list in place is not detected.'''
+        plan = self._render_plan
+        if plan is None or plan.widgets is not self.widgets \
+                or plan.term_width != self.term_width:
+            plan = self._render_plan = self._compile_render_plan()
+        return plan
+
+    def _compile_render_plan(self):
+        if isinstance(self.widgets, templates.Template):
+            return self.widgets.compile(self.term_width)
+        else:
+            return RenderPlan(self.widgets, self.term_width)
 
-    @classmethod
-    def _to_unicode(cls, args):
-        for arg in args:
-            yield converters.to_unicode(arg)
+    def _format_widgets(self):
+        return self._get_render_plan().render(self, self.data())
 
     def _format_line(self):
         'Joins the widgets and justifies the line'
 
-        widgets = ''.join(self._to_unicode(self._format_widgets()))
+        widgets = ''.join(self._format_widgets())
 
         if self.left_justify:
             return widgets.ljust(self.term_width)
@@ -500,35 +1047,57 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
     def _needs_update(self):
         'Returns whether the ProgressBar should redraw the line.'
 
-        if self.poll_interval:
-            delta = datetime.now() - self.last_update_time
-            poll_status = delta > self.poll_interval
+        # Only values outside of the interval of the last redraw can change
+        # the percentage or the bar
+        if not self._update_floor <= self.value < self.next_update:
+            self._set_update_interval()
+            return True
+
+        if self._end_time is not None:
+            return True
+        elif self._poll_interval:
+            delta = utils.clock() - self._last_update_time
+            return delta > self._poll_interval
         else:
-            poll_status = False
-
-        # Do not update if value increment is not large enough to
-        # add more bars to progressbar (according to current
-        # terminal width)
+            return False
+
+    def _set_update_interval(self):
+        '''Calculates the interval of values around the current value for
+        which the percentage and the bar stay the same, this splits the
+        range in `num_intervals` intervals (at least 1 per percent and per
+        step a bar can show on the terminal)'''
+        value = self.value
+        self.num_intervals = max(
+            100, self.term_width * self._get_render_plan().resolution)
         try:
-            divisor = self.max_value / self.term_width  # float division
-            if self.value // divisor == self.previous_value // divisor:
-                return poll_status or self.end_time
-        except Exception:
-            # ignore any division errors
-            pass
-
-        return self.value > self.next_update or poll_status or self.end_time
+            step = (self.max_value - self.min_value) / self.num_intervals
+            interval = (value - self.min_value) // step
+        except (TypeError, ZeroDivisionError):
+            # Without a known range any change could be visible
+            self._update_floor = self.next_update = value
+        else:
+            self._update_floor = self.min_value + interval * step
+            self.next_update = self._update_floor + step
 
     def update(self, value=None, force=False, **kwargs):
         'Updates the ProgressBar to a new value.'
-        if self.start_time is None:
+        if self._lock is not None:
+            # Thread safe mode, combine the counters of all threads
+            with self._lock:
+                return self._update(
+                    self._merge_shards(value), force=force, **kwargs)
+
+        return self._update(value, force=force, **kwargs)
+
+    def _update(self, value=None, force=False, **kwargs):
+        if self._start_time is None:
             self.start()
             return self.update(value, force=force, **kwargs)
 
-        current_time = time.time()
-        minimum_update_interval = self._MINIMUM_UPDATE_INTERVAL
-        if current_time - self._last_update_time < minimum_update_interval:
-            # Prevent updating too often
+        if self._store_only and not kwargs:
+            # The render thread or manager takes care of redrawing
+            if value is not None:
+                self.value = value
             return
 
         # Save the updated values for dynamic messages
@@ -552,17 +1121,60 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
                     'Value out of range, should be between %s and %s'
                     % (self.min_value, self.max_value))
 
-            self.previous_value = self.value
             self.value = value
 
+        if self._store_only:
+            # Dynamic messages are stored as well, see above
+            return
+
+        if not force and self._poll_interval is None \
+                and self._end_time is None \
+                and self._update_floor <= self.value < self.next_update:
+            # Without a poll interval only a value outside of the interval
+            # of the last redraw can change the line, so the clock isn't
+            # needed
+            self.previous_value = self.value
+            return
+
+        current_time = utils.clock()
+        minimum_update_interval = self._MINIMUM_UPDATE_INTERVAL
+        elapsed = current_time - self._last_update_time
+        if not force and elapsed < minimum_update_interval:
+            # Prevent updating too often (unless forced), the value is stored
+            # but the previous_value is kept so the next check sees the full
+            # change
+            return
+
         if self._needs_update() or force:
-            self.updates += 1
-            ResizableMixin.update(self, value=value)
-            ProgressBarBase.update(self, value=value)
-            StdRedirectMixin.update(self, value=value)
+            self._redraw(value)
 
-            # Only flush if something was actually written
-            self.fd.flush()
+        self.previous_value = self.value
+
+    def _redraw(self, value=None):
+        'Renders the widgets and writes the line'
+        if self._pid != os.getpid():
+            # Inherited by a forked process, only the parent draws
+            return
+
+        self.updates += 1
+        ResizableMixin.update(self, value=value)
+        ProgressBarBase.update(self, value=value)
+        StdRedirectMixin.update(self, value=value)
+
+    def _render_frame(self):
+        'Redraws the bar with the latest value, called by the render thread'
+        if self._lock is not None:
+            with self._lock:
+                self.value = self._merge_shards()
+                self._draw_frame()
+        else:
+            self._draw_frame()
+
+    def _draw_frame(self):
+        value = self.value
+        if self._needs_update():
+            self._redraw(value)
+        self.previous_value = value
 
     def start(self, max_value=None):
         '''Starts measuring time, and prints the bar at 0%.
@@ -587,6 +1199,7 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
         # Constructing the default widgets is only done when we know max_value
         if self.widgets is None:
             self.widgets = self.default_widgets()
+        self._render_plan = self._compile_render_plan()
 
         for widget in self.widgets:
             interval = getattr(widget, 'INTERVAL', None)
@@ -596,22 +1209,52 @@ class ProgressBar(StdRedirectMixin, ResizableMixin, ProgressBarBase):
                     interval,
                 )
 
+        # Make sure the first check sets the interval
         self.num_intervals = max(100, self.term_width)
-        self.next_update = 0
+        self._update_floor = self.next_update = self.min_value
 
         if self.max_value is not base.UnknownLength and self.max_value < 0:
             raise ValueError('Value out of range')
 
-        self.start_time = self.last_update_time = datetime.now()
+        self._start_time = self._last_update_time = utils.clock()
         self.update(self.min_value, force=True)
+        if self._pid == os.getpid():
+            self.backend.start(self)
+
+        # Start iterating with a full update for every item
+        self._stride = 1
+        self._stride_time = self._start_time
+        self._stride_value = self.value
+        self._stride_end = self._next_stride_value = self.value + 1
+
+        if self.threaded and not self._store_only:
+            self._store_only = True
+            self._render_thread = RenderThread(
+                self._render_frame, self._MINIMUM_UPDATE_INTERVAL)
+            self._render_thread.start()
 
         return self
 
     def finish(self):
         'Puts the ProgressBar bar in the finished state.'
 
-        self.end_time = datetime.now()
-        self.update(self.max_value)
+        if self._render_thread is not None:
+            self._render_thread.stop()
+            self._render_thread = None
+            self._store_only = not self.backend.renders
+
+        if self._manager is not None:
+            # The manager draws the final state of the bar, the value is set
+            # first so the manager never draws a finished bar too early
+            self.update(self.max_value)
+            self._end_time = utils.clock()
+            self._finish_redirect()
+            return
+
+        # The final state is always drawn, even if the render thread just
+        # drew a frame
+        self._end_time = utils.clock()
+        self.update(self.max_value, force=True)
 
         StdRedirectMixin.finish(self)
         ResizableMixin.finish(self)
@@ -650,6 +1293,10 @@ class NullBar(ProgressBar):
     flags
     '''
 
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('disabled', True)
+        ProgressBar.__init__(self, *args, **kwargs)
+
     def start(self, *args, **kwargs):
         return self
 
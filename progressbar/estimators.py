@@ -0,0 +1,208 @@
+'''Rate estimators for the ETA and transfer speed widgets
+
+An estimator receives `(time, value)` samples and estimates the current
+rate in value per second. All estimators use constant memory and constant
+time per sample so they can be fed at every update.
+
+The widgets take an estimator class (or any callable which returns an
+estimator) so every progressbar gets its own estimator:
+
+>>> from progressbar import widgets
+>>> eta = widgets.ETA(estimator=EWMAEstimator)
+'''
+from __future__ import absolute_import
+from __future__ import division
+
+import abc
+
+from . import six
+from . import utils
+
+
+class Estimator(six.with_metaclass(abc.ABCMeta, object)):
+    '''Estimates the rate in value per second from `(time, value)` samples
+
+    The times are `utils.clock()` floats, samples which are not newer than
+    the last sample are ignored.
+    '''
+
+    def __init__(self):
+        self.last_time = None
+        self.last_value = None
+
+    def add(self, time, value):
+        'Adds a sample, returns `True` if the sample was used'
+        if self.last_time is not None and time <= self.last_time:
+            return False
+
+        self._add(time, value)
+        self.last_time = time
+        self.last_value = value
+        return True
+
+    @abc.abstractmethod
+    def _add(self, time, value):  # pragma: no cover
+        pass
+
+    @abc.abstractmethod
+    def rate(self):  # pragma: no cover
+        '''Returns the estimated rate in value per second or `None` if there
+        are not enough samples yet'''
+
+
+class TimeWindowEstimator(Estimator):
+    '''Averages the rate over the last `window` seconds
+
+    The window is split in `buckets` so only the first sample of every
+    bucket is stored, the window therefore slides in steps of
+    `window / buckets` seconds.
+
+    >>> estimator = TimeWindowEstimator(window=10, buckets=10)
+    >>> for second in range(100):
+    ...     _ = estimator.add(second, second * 2)
+    >>> estimator.rate()
+    2.0
+    '''
+
+    def __init__(self, window=10., buckets=20):
+        Estimator.__init__(self)
+        self.bucket_size = window / buckets
+        self.times = utils.RingBuffer(buckets + 1)
+        self.values = utils.RingBuffer(buckets + 1)
+
+    def _add(self, time, value):
+        if not self.times or time - self.times[-1] >= self.bucket_size:
+            self.times.append(time)
+            self.values.append(value)
+
+    def rate(self):
+        if self.last_time is None or self.last_time == self.times[0]:
+            return None
+
+        return (self.last_value - self.values[0]) / (
+            self.last_time - self.times[0])
+
+
+class EWMAEstimator(Estimator):
+    '''Exponentially weighted moving average of the rate
+
+    The weight of a sample halves every `half_life` seconds so bursts are
+    smoothed out while changes in the rate are still picked up.
+
+    >>> estimator = EWMAEstimator(half_life=1)
+    >>> for second in range(100):
+    ...     _ = estimator.add(second, second * 2)
+    >>> estimator.rate()
+    2.0
+    '''
+
+    def __init__(self, half_life=5.):
+        Estimator.__init__(self)
+        self.half_life = half_life
+        self.average = None
+
+    def _add(self, time, value):
+        if self.last_time is None:
+            return
+
+        elapsed = time - self.last_time
+        rate = (value - self.last_value) / elapsed
+        if self.average is None:
+            self.average = rate
+        else:
+            alpha = 1 - 2 ** (-elapsed / self.half_life)
+            self.average += alpha * (rate - self.average)
+
+    def rate(self):
+        return self.average
+
+
+class LinearRegressionEstimator(Estimator):
+    '''Online least squares fit of the value over time, the slope is the
+    rate
+
+    When `half_life` is given the weight of older samples decays so the fit
+    follows changes in the rate.
+
+    >>> estimator = LinearRegressionEstimator()
+    >>> for second in range(100):
+    ...     _ = estimator.add(second, second * 2 + second % 2)
+    >>> round(estimator.rate(), 2)
+    2.0
+    '''
+
+    def __init__(self, half_life=None):
+        Estimator.__init__(self)
+        self.half_life = half_life
+        self.first_time = None
+        self.weight = self.sum_x = self.sum_y = 0.
+        self.sum_xx = self.sum_xy = 0.
+
+    def _add(self, time, value):
+        if self.first_time is None:
+            self.first_time = time
+        elif self.half_life:
+            decay = 2 ** (-(time - self.last_time) / self.half_life)
+            self.weight *= decay
+            self.sum_x *= decay
+            self.sum_y *= decay
+            self.sum_xx *= decay
+            self.sum_xy *= decay
+
+        # Relative times keep the sums small enough to stay accurate
+        x = time - self.first_time
+        self.weight += 1
+        self.sum_x += x
+        self.sum_y += value
+        self.sum_xx += x * x
+        self.sum_xy += x * value
+
+    def rate(self):
+        variance = self.weight * self.sum_xx - self.sum_x * self.sum_x
+        if variance <= 0:
+            return None
+
+        return (self.weight * self.sum_xy - self.sum_x * self.sum_y) \
+            / variance
+
+
+class RateHistory(Estimator):
+    '''Keeps the average rate of the last `buckets` periods of `bucket_size`
+    seconds, the newest rate is last
+
+    >>> history = RateHistory(bucket_size=1, buckets=3)
+    >>> for second in range(10):
+    ...     _ = history.add(second, second * second)
+    >>> list(history.history)
+    [13.0, 15.0, 17.0]
+    '''
+
+    def __init__(self, bucket_size=1., buckets=200):
+        Estimator.__init__(self)
+        self.bucket_size = bucket_size
+        self.history = utils.RingBuffer(buckets)
+        self.bucket_time = None
+        self.bucket_value = None
+
+    def _add(self, time, value):
+        if self.bucket_time is None:
+            self.bucket_time = time
+            self.bucket_value = value
+            return
+
+        elapsed = time - self.bucket_time
+        if elapsed < self.bucket_size:
+            return
+
+        # A sample after a stall closes multiple buckets at once
+        rate = (value - self.bucket_value) / elapsed
+        buckets = min(int(elapsed / self.bucket_size), self.history.capacity)
+        for _ in range(buckets):
+            self.history.append(rate)
+
+        self.bucket_time = time
+        self.bucket_value = value
+
+    def rate(self):
+        if self.history:
+            return self.history[-1]
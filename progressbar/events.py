@@ -0,0 +1,44 @@
+'''Progressbars which write JSON lines events instead of drawing'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import sys
+
+from . import bar
+from . import backends
+
+
+class JsonEventBar(bar.ProgressBar):
+    '''A progressbar which writes a JSON object per line for every event
+    instead of drawing a bar, see `backends.JsonBackend` for the events
+
+    Progress events are throttled like redraws of a regular progressbar and
+    the fd is only flushed every `flush_interval` seconds and for the other
+    events.
+
+    >>> import io
+    >>> import json
+    >>> fd = io.StringIO()
+    >>> with JsonEventBar(max_value=10, fd=fd) as progress:
+    ...     for i in range(10):
+    ...         progress.update(i)
+    >>> events = [json.loads(line) for line in fd.getvalue().splitlines()]
+    >>> str(events[0]['event']), str(events[-1]['event'])
+    ('start', 'finish')
+    '''
+
+    def __init__(self, fd=sys.stderr, flush_interval=1., **kwargs):
+        # Nothing is drawn so widgets would only waste time
+        kwargs.setdefault('widgets', [])
+        kwargs.setdefault('term_width', 80)
+        bar.ProgressBar.__init__(
+            self, fd=fd, backend=backends.JsonBackend(fd, flush_interval),
+            **kwargs)
+
+    def event(self, name, **fields):
+        'Returns the event with all the data of the progressbar'
+        return self.backend.event(self, name, **fields)
+
+    def write_event(self, name, flush=True, **fields):
+        self.backend.write_event(self, name, flush=flush, **fields)
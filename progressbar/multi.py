@@ -0,0 +1,194 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+from __future__ import with_statement
+
+import sys
+import threading
+
+from python_utils import converters
+
+from . import bar
+from . import utils
+
+
+class MultiBar(object):
+    '''Renders multiple progressbars on consecutive lines of the terminal
+
+    The bars only store their values when updated, the MultiBar redraws
+    all changed bars with a single cursor addressed write per frame from a
+    background thread.
+
+    >>> import io
+    >>> with MultiBar(fd=io.StringIO(), term_width=40) as multi:
+    ...     bars = [multi.add(bar.ProgressBar(max_value=10))
+    ...             for _ in range(3)]
+    ...     for i in range(10):
+    ...         for progress in bars:
+    ...             progress.update(i)
+    ...     for progress in bars:
+    ...         progress.finish()
+    '''
+
+    #: The escape codes to move the cursor up and down
+    UP = '\x1b[%dA'
+    DOWN = '\x1b[%dB'
+
+    def __init__(self, fd=sys.stderr, term_width=None, render_interval=0.05):
+        '''
+        Args:
+            fd (file): The file to write the bars to
+            term_width (int): The width of the terminal, detected (and
+                              updated on resize) if not given
+            render_interval (float): The time between two frames in seconds
+        '''
+        self.fd = fd
+        self.render_interval = render_interval
+        self.bars = []
+        self.signal_set = False
+
+        if term_width:
+            self.term_width = term_width
+        else:
+            self.term_width, _ = utils.get_terminal_size(fd)
+            try:
+                import signal
+                self._prev_handle = signal.getsignal(signal.SIGWINCH)
+                signal.signal(signal.SIGWINCH, self._handle_resize)
+                self.signal_set = True
+            except Exception:  # pragma: no cover
+                pass
+
+        # The lines currently on the terminal, the cursor is kept at the
+        # start of the line below the last bar
+        self._lines = []
+        # The finished bars which have been drawn in their final state
+        self._finished = set()
+        self._lock = threading.Lock()
+        self._render_thread = None
+
+    def _handle_resize(self, signum=None, frame=None):  # pragma: no cover
+        'Tries to catch resize signals sent from the terminal.'
+        w, h = utils.get_terminal_size(self.fd, refresh=signum is not None)
+        self.term_width = w
+        for progress in self.bars:
+            progress.term_width = w
+
+    # See `bar.ResizableMixin._handle_resize`
+    _handle_resize.clears_terminal_sizes = True
+
+    def add(self, progress):
+        '''Adds a progressbar to the bottom and returns it. The bar will
+        never write to its own fd while it is managed by the MultiBar.'''
+        if progress.signal_set:
+            # Only the MultiBar should handle resizing
+            bar.ResizableMixin.finish(progress)
+            progress.signal_set = False
+
+            if self.signal_set:
+                # Bars which were created before being added restore each
+                # other's handlers, so the handler of the bar is not
+                # necessarily the one it replaced
+                try:
+                    import signal
+                    signal.signal(signal.SIGWINCH, self._handle_resize)
+                except Exception:  # pragma: no cover
+                    pass
+
+        progress.term_width = self.term_width
+        progress._manager = self
+        progress._store_only = True
+        self.bars.append(progress)
+        return progress
+
+    def start(self):
+        'Starts the render thread'
+        if self._render_thread is None:
+            self._render_thread = bar.RenderThread(
+                self.render, self.render_interval)
+            self._render_thread.start()
+        return self
+
+    def _render_bar(self, progress, force):
+        '''Returns the new line for the bar or `None` if it doesn't have to
+        be redrawn'''
+        if progress._start_time is None or id(progress) in self._finished:
+            return None
+
+        if progress._end_time is not None:
+            self._finished.add(id(progress))
+            force = True
+
+        if progress._lock is not None:
+            # Managed bars never render themselves so the thread counters
+            # are combined here, like `ProgressBar._render_frame()` does
+            with progress._lock:
+                progress.value = progress._merge_shards()
+                return self._render_line(progress, force)
+
+        return self._render_line(progress, force)
+
+    def _render_line(self, progress, force):
+        if force or progress._needs_update():
+            progress.updates += 1
+            line = progress._format_line()
+            progress.previous_value = progress.value
+            return line
+
+    def render(self, force=False):
+        'Redraws all changed bars with a single write'
+        with self._lock:
+            bars = self.bars[:]
+            lines = self._lines
+            output = []
+
+            # Make room for newly added bars
+            if len(bars) > len(lines):
+                output.append('\n' * (len(bars) - len(lines)))
+                lines.extend([''] * (len(bars) - len(lines)))
+
+            row = len(lines)
+            for index, progress in enumerate(bars):
+                line = self._render_bar(progress, force)
+                if line is None or line == lines[index]:
+                    continue
+
+                lines[index] = line
+                if row > index:
+                    output.append(self.UP % (row - index))
+                elif row < index:
+                    output.append(self.DOWN % (index - row))
+                output.append('\r' + line)
+                row = index
+
+            if not output:
+                return
+
+            if row < len(lines):
+                output.append(self.DOWN % (len(lines) - row))
+            output.append('\r')
+
+            self.fd.write(converters.to_unicode(''.join(output)))
+            self.fd.flush()
+
+    def finish(self):
+        'Stops the render thread and draws the final state of all bars'
+        if self._render_thread is not None:
+            self._render_thread.stop()
+            self._render_thread = None
+
+        self.render(force=True)
+
+        if self.signal_set:
+            try:
+                import signal
+                signal.signal(signal.SIGWINCH, self._prev_handle)
+            except Exception:  # pragma no cover
+                pass
+            self.signal_set = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish()
@@ -0,0 +1,38 @@
+'''Progress counters which can be shared between processes'''
+import ctypes
+import multiprocessing
+
+
+class SharedCounter(object):
+    '''An integer counter in shared memory which worker processes can add to
+
+    The counter has to be passed to the workers when they are started, for
+    example through the `initargs` of a `multiprocessing.Pool` or the
+    `args` of a `multiprocessing.Process`. Usually the counter is created
+    through `ProgressBar.shared_counter()` so the bar reads it when
+    rendering.
+
+    >>> counter = SharedCounter()
+    >>> counter += 5
+    >>> counter.increment()
+    >>> counter.value
+    6
+    '''
+
+    def __init__(self, value=0, context=None):
+        # The `q` typecode is not available on Python 2
+        self._value = (context or multiprocessing).Value(
+            ctypes.c_longlong, value)
+
+    def increment(self, value=1):
+        'Atomically adds the value to the counter'
+        with self._value.get_lock():
+            self._value.value += value
+
+    def __iadd__(self, value):
+        self.increment(value)
+        return self
+
+    @property
+    def value(self):
+        return self._value.value
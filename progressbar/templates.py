@@ -0,0 +1,177 @@
+'''Layouts declared as a single format string instead of a list of widgets'''
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import math
+import string
+
+from python_utils import converters
+
+from . import widgets as widgets_module
+
+# Marks the position of the auto width widgets in the formatted line
+SENTINEL = '\x00'
+
+
+class NotAvailable(object):
+    '''Replaces unknown (`None`) variables, like the percentage of an
+    iterable without a length, since the format specs of numbers can't
+    format `None`'''
+
+    def __format__(self, spec):
+        return 'N/A'
+
+    def __str__(self):
+        return 'N/A'
+
+    __repr__ = __str__
+
+
+NOT_AVAILABLE = NotAvailable()
+
+
+class Template(object):
+    '''A progressbar layout declared as a `str.format` style template
+
+    >>> import io
+    >>> from progressbar import bar
+    >>> progress = bar.ProgressBar(
+    ...     widgets=Template('{percentage:3.0f}% {bar}'),
+    ...     max_value=10, term_width=20, fd=io.StringIO())
+    >>> str(progress.start()._format_line())
+    '  0% |             |'
+
+    The fields are either variables of the progressbar (`value`,
+    `max_value`, `percentage`, `time_elapsed`, etc.) or widgets. The
+    `default_fields` are available by name and other widgets can be given
+    as keyword arguments, any other field raises a `ValueError`. The
+    template is parsed once, the variables and fixed width widgets are
+    formatted with a single `format` call and only the auto width widgets
+    are rendered separately to fill the line.
+    '''
+
+    #: The widgets which can be used as fields without passing them
+    default_fields = dict(
+        bar=widgets_module.Bar,
+        smooth_bar=widgets_module.SmoothBar,
+        sparkline=widgets_module.Sparkline,
+        eta=widgets_module.ETA,
+        adaptive_eta=widgets_module.AdaptiveETA,
+        timer=widgets_module.Timer,
+        speed=widgets_module.FileTransferSpeed,
+        adaptive_speed=widgets_module.AdaptiveTransferSpeed,
+        data_size=widgets_module.DataSize,
+        marker=widgets_module.AnimatedMarker,
+    )
+
+    def __init__(self, template, **fields):
+        self.template = converters.to_unicode(template)
+        # The (name, widget) pairs of the fixed and auto width widgets
+        self.fixed = []
+        self.expanding = []
+        # The names of the progressbar variables
+        self.variables = []
+
+        # Imported here since the bar module uses this module
+        from .bar import ProgressData
+        variables = ProgressData.eager_keys + ProgressData.lazy_keys
+
+        format = []
+        widgets = {}
+        for literal, field, spec, conversion in \
+                string.Formatter().parse(self.template):
+            format.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is None:
+                continue
+
+            # Only the base name of `name.attribute` or `name[key]` fields
+            name = field.split('.')[0].split('[')[0]
+            if name not in widgets:
+                if name in fields:
+                    widgets[name] = fields[name]
+                elif name in self.default_fields:
+                    widgets[name] = self.default_fields[name]()
+                else:
+                    widgets[name] = None
+
+            widget = widgets[name]
+            if isinstance(widget, widgets_module.AutoWidthWidgetBase):
+                format.append(SENTINEL)
+                self.expanding.append((name, widget))
+                continue
+            elif widget is None:
+                if name not in variables:
+                    raise ValueError(
+                        'Unknown template field %r, it is neither a widget '
+                        'nor a progressbar variable' % name)
+                if name not in self.variables:
+                    self.variables.append(name)
+            elif (name, widget) not in self.fixed:
+                self.fixed.append((name, widget))
+
+            format.append('{' + field)
+            if conversion:
+                format.append('!' + conversion)
+            if spec:
+                format.append(':' + spec)
+            format.append('}')
+
+        self.format = ''.join(format).format
+
+    def __iter__(self):
+        'Iterates over the widgets, like a list of widgets would'
+        for name, widget in self.fixed:
+            yield widget
+        for name, widget in self.expanding:
+            yield widget
+
+    def compile(self, term_width):
+        'Returns the plan to render this template for the given width'
+        return TemplatePlan(self, term_width)
+
+
+class TemplatePlan(object):
+    '''A `Template` compiled for rendering at a specific width, the
+    template equivalent of `bar.RenderPlan`'''
+
+    def __init__(self, template, term_width):
+        self.widgets = template
+        self.term_width = term_width
+        # The highest number of steps a single character can show
+        self.resolution = 1
+        for name, widget in template.expanding:
+            self.resolution = max(
+                self.resolution, getattr(widget, 'resolution', 1))
+
+    def render(self, progress, data):
+        '''Render the template and return the list of outputs'''
+        template = self.widgets
+        values = {}
+        for name in template.variables:
+            value = data[name]
+            if value is None:
+                value = NOT_AVAILABLE
+            values[name] = value
+        for name, widget in template.fixed:
+            values[name] = converters.to_unicode(widget(progress, data))
+
+        line = template.format(**values)
+        if not template.expanding:
+            return [line]
+
+        parts = line.split(SENTINEL)
+        width = self.term_width - sum(len(part) for part in parts)
+        result = [parts[0]]
+        count = len(template.expanding)
+        for (name, widget), part in zip(template.expanding, parts[1:]):
+            portion = max(int(math.ceil(width * 1. / count)), 0)
+            count -= 1
+
+            widget_output = converters.to_unicode(
+                widget(progress, data, portion))
+            width -= len(widget_output)
+            result.append(widget_output)
+            result.append(part)
+
+        return result
@@ -1,5 +1,8 @@
 import os
 import math
+import time
+import array
+import bisect
 import datetime
 
 from . import six
@@ -9,6 +12,39 @@ from . import six
 # a pull request if you know a better way that functions for Python 2 and 3
 epoch = datetime.datetime(year=1970, month=1, day=1)
 
+# The monotonic clock used for all internal timing. Python 2 doesn't have
+# `time.perf_counter` so we fall back to the (non-monotonic) `time.time`
+clock = getattr(time, 'perf_counter', time.time)
+
+# The offset between `clock()` and the unix epoch, used to convert clock
+# values into datetimes when a widget actually needs them
+_clock_offset = time.time() - clock()
+
+
+def clock_to_datetime(value):
+    '''Convert a `clock()` value to a `datetime.datetime`
+
+    >>> now = clock()
+    >>> abs(timestamp(clock_to_datetime(now)) - time.time()) < 1
+    True
+    >>> clock_to_datetime(None)
+    '''
+    if value is not None:
+        return datetime.datetime.fromtimestamp(value + _clock_offset)
+
+
+def datetime_to_clock(value):
+    '''Convert a `datetime.datetime` to a `clock()` value
+
+    >>> now = clock()
+    >>> abs(datetime_to_clock(clock_to_datetime(now)) - now) < 1e-3
+    True
+    >>> datetime_to_clock(None)
+    '''
+    if value is not None:
+        return time.mktime(value.timetuple()) + value.microsecond * 1e-6 \
+            - _clock_offset
+
 
 def timedelta_to_seconds(delta):
     '''Convert a timedelta to seconds with the microseconds as fraction
@@ -32,6 +68,42 @@ def timedelta_to_seconds(delta):
     return total
 
 
+#: The IEC binary prefixes for powers of 1024
+BINARY_PREFIXES = ('', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei', 'Zi', 'Yi')
+#: The SI decimal prefixes for powers of 1000
+DECIMAL_PREFIXES = ('', 'k', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y')
+
+# The powers of every base used so far, so scaling is a lookup
+_scale_divisors = {}
+
+
+def scale(x, n_prefixes, base=1024):
+    '''Scale a number down to a suitable size, based on powers of `base`.
+
+    Returns the scaled number and the power of `base` used. The power is
+    found by comparing against the exact powers so there are no rounding
+    errors at the boundaries.
+
+    >>> scale(1000 ** 2, 9, 1000)
+    (1.0, 2)
+    >>> scale(999999, 9, 1000)
+    (999.999, 1)
+    >>> scale(1024 ** 5, 9)
+    (1.0, 5)
+    >>> scale(1024 ** 5 - 1, 9)[1]
+    4
+    >>> scale(1024 ** 3, 2)
+    (1048576.0, 1)
+    '''
+    divisors = _scale_divisors.get(base)
+    if divisors is None or len(divisors) < n_prefixes:
+        divisors = _scale_divisors[base] = [
+            base ** power for power in range(max(n_prefixes, 9))]
+
+    power = max(bisect.bisect_right(divisors, x, 0, n_prefixes) - 1, 0)
+    return float(x) / divisors[power], power
+
+
 def scale_1024(x, n_prefixes):
     '''Scale a number down to a suitable size, based on powers of 1024.
 
@@ -50,24 +122,233 @@ def scale_1024(x, n_prefixes):
     >>> scale_1024(1, 2)
     (1.0, 0)
     '''
-    if x <= 0:
-        power = 0
-    else:
-        power = min(int(math.log(x, 2) / 10), n_prefixes - 1)
-    scaled = float(x) / (2 ** (10 * power))
-    return scaled, power
+    return scale(x, n_prefixes, 1024)
+
+
+def scale_1000(x, n_prefixes):
+    '''Scale a number down to a suitable size, based on powers of 1000.
+
+    Returns the scaled number and the power of 1000 used.
+
+    Use to format numbers of bytes to kB, MB, etc.
+
+    >>> scale_1000(310, 3)
+    (310.0, 0)
+    >>> scale_1000(2000, 3)
+    (2.0, 1)
+    '''
+    return scale(x, n_prefixes, 1000)
+
+
+class RingBuffer(object):
+    '''Fixed capacity buffer of floats, the oldest item is dropped when an
+    item is appended to a full buffer. Appending and indexing are O(1).
+
+    >>> buffer = RingBuffer(3)
+    >>> for i in range(5):
+    ...     buffer.append(i)
+    >>> len(buffer), buffer[0], buffer[-1]
+    (3, 2.0, 4.0)
+    >>> list(buffer)
+    [2.0, 3.0, 4.0]
+    >>> buffer[3]
+    Traceback (most recent call last):
+        ...
+    IndexError: RingBuffer index out of range
+    '''
+
+    def __init__(self, capacity):
+        self.capacity = max(capacity, 1)
+        # Grows until the capacity is reached so large capacities only cost
+        # memory when they are actually used
+        self.items = array.array('d')
+        # The index of the oldest item and the number of items
+        self.start = 0
+        self.length = 0
+
+    def append(self, value):
+        if self.length < self.capacity:
+            # Nothing was dropped yet so the oldest item is the first
+            self.items.append(value)
+            self.length += 1
+        else:
+            self.items[self.start] = value
+            self.start = (self.start + 1) % self.capacity
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('RingBuffer index out of range')
+        return self.items[(self.start + index) % self.capacity]
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.items[(self.start + index) % self.capacity]
+
+
+class QuantileSketch(object):
+    '''Streaming quantiles of positive values (like durations) with a
+    relative error of at most `accuracy`
+
+    The values are counted in logarithmic buckets so the memory only
+    depends on the range of the values, at most `max_buckets` buckets are
+    kept by merging the lowest buckets.
+
+    >>> sketch = QuantileSketch()
+    >>> for i in range(1, 1001):
+    ...     sketch.add(i)
+    >>> len(sketch)
+    1000
+    >>> all(abs(sketch.quantile(q / 100.) - q * 10) <= q * 10 * 0.01
+    ...     for q in (50, 95, 99))
+    True
+    '''
+
+    def __init__(self, accuracy=0.01, max_buckets=2048):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if value <= 0:
+            self.zeros += 1
+            return
+
+        index = int(math.ceil(math.log(value) / self.log_gamma))
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + 1
+        if len(buckets) > self.max_buckets:  # pragma: no cover
+            lowest = buckets.pop(min(buckets))
+            buckets[min(buckets)] += lowest
+
+    def __len__(self):
+        return self.count
+
+    def quantile(self, q):
+        '''Returns the value at quantile `q` (between 0 and 1) or `None` if
+        no values were added'''
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return self.min
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max  # pragma: no cover
+
+
+# Spawning `tput` is slow so it's only tried when enabled explicitly
+tput_fallback = False
+
+# The detected terminal sizes by file descriptor, `None` for unknown fds
+_terminal_sizes = {}
+# The SIGWINCH handler which was replaced by `_clear_terminal_sizes`
+_previous_resize_handler = None
+
+
+def _fileno(fd):
+    try:
+        return fd.fileno()
+    except Exception:
+        return None
 
 
-def get_terminal_size():  # pragma: no cover
+def _clear_terminal_sizes(signum=None, frame=None):
+    'SIGWINCH handler which clears the cache and calls the replaced handler'
+    _terminal_sizes.clear()
+    if callable(_previous_resize_handler):
+        _previous_resize_handler(signum, frame)
+
+
+# Resize handlers with this attribute keep the cache up to date
+_clear_terminal_sizes.clears_terminal_sizes = True
+
+
+def _watch_resize():
+    '''Makes sure resizes clear the cached sizes, returns `False` if they
+    can't be detected so the sizes can't be cached'''
+    global _previous_resize_handler
+    try:
+        import signal
+        handler = signal.getsignal(signal.SIGWINCH)
+        if getattr(handler, 'clears_terminal_sizes', False):
+            return True
+
+        signal.signal(signal.SIGWINCH, _clear_terminal_sizes)
+    except Exception:
+        # Windows has no SIGWINCH and only the main thread can set handlers
+        return False
+
+    _previous_resize_handler = handler
+    return True
+
+
+def get_terminal_size(fd=None, refresh=False):
     '''Get the current size of your terminal
 
-    Multiple returns are not always a good idea, but in this case it greatly
-    simplifies the code so I believe it's justified. It's not the prettiest
-    function but that's never really possible with cross-platform code.
+    The size is detected once per file descriptor and cached for the whole
+    process, a SIGWINCH handler clears the cache when the terminal is
+    resized. Pass `refresh` to detect the size again (like the resize
+    handlers of the progressbars do).
+
+    >>> get_terminal_size() is get_terminal_size()
+    True
+
+    Args:
+        fd (file): The file (or file descriptor) the size is needed for
+        refresh (bool): Detect the size instead of using the cached size
 
     Returns:
         width, height: Two integers containing width and height
     '''
+    if fd is not None and not isinstance(fd, int):
+        fd = _fileno(fd)
+
+    if not _watch_resize():
+        return _get_terminal_size(fd)
+
+    if refresh:
+        # The sizes of the other fds are outdated as well
+        _terminal_sizes.clear()
+    else:
+        try:
+            return _terminal_sizes[fd]
+        except KeyError:
+            pass
+
+    size = _terminal_sizes[fd] = _get_terminal_size(fd)
+    return size
+
+
+def _get_terminal_size(fd=None):  # pragma: no cover
+    '''Detects the size of the terminal
+
+    Multiple returns are not always a good idea, but in this case it greatly
+    simplifies the code so I believe it's justified. It's not the prettiest
+    function but that's never really possible with cross-platform code.
+    '''
     try:
         # This works for Python 3, but not Pypy3. Probably the best method if
         # it's supported so let's always try
@@ -108,7 +389,7 @@ def get_terminal_size():  # pragma: no cover
         pass
 
     try:
-        w, h = _get_terminal_size_linux()
+        w, h = _get_terminal_size_linux(fd)
         if w and h:
             return w, h
     except Exception:  # pragma: no cover
@@ -122,13 +403,14 @@ def get_terminal_size():  # pragma: no cover
     except Exception:  # pragma: no cover
         pass
 
-    try:
-        # needed for window's python in cygwin's xterm!
-        w, h = _get_terminal_size_tput()
-        if w and h:
-            return w, h
-    except Exception:  # pragma: no cover
-        pass
+    if tput_fallback:
+        try:
+            # needed for window's python in cygwin's xterm!
+            w, h = _get_terminal_size_tput()
+            if w and h:
+                return w, h
+        except Exception:  # pragma: no cover
+            pass
 
     return 79, 24
 
@@ -178,7 +460,7 @@ def _get_terminal_size_tput():  # pragma: no cover
         return None
 
 
-def _get_terminal_size_linux():  # pragma: no cover
+def _get_terminal_size_linux(fd=None):  # pragma: no cover
     def ioctl_GWINSZ(fd):
         try:
             import fcntl
@@ -190,7 +472,12 @@ def _get_terminal_size_linux():  # pragma: no cover
             return None
         return size
 
-    size = ioctl_GWINSZ(0) or ioctl_GWINSZ(1) or ioctl_GWINSZ(2)
+    size = None
+    if fd is not None:
+        size = ioctl_GWINSZ(fd)
+
+    if not size:
+        size = ioctl_GWINSZ(0) or ioctl_GWINSZ(1) or ioctl_GWINSZ(2)
 
     if not size:
         try:
@@ -208,7 +495,34 @@ def _get_terminal_size_linux():  # pragma: no cover
     return int(size[1]), int(size[0])
 
 
-def format_time(time, precision=datetime.timedelta(seconds=1)):
+# The formatted strings of the recently formatted whole seconds
+_time_strings = {}
+_second = datetime.timedelta(seconds=1)
+
+
+def _format_seconds(seconds):
+    '''Formats whole seconds like `str(datetime.timedelta(...))` does,
+    the results are cached since the same seconds are formatted for many
+    frames'''
+    try:
+        return _time_strings[seconds]
+    except KeyError:
+        pass
+
+    if 0 <= seconds < 24 * 60 * 60:
+        minutes, second = divmod(seconds, 60)
+        hours, minute = divmod(minutes, 60)
+        formatted = '%d:%02d:%02d' % (hours, minute, second)
+    else:
+        formatted = str(datetime.timedelta(seconds=seconds))
+
+    if len(_time_strings) >= 1024:
+        _time_strings.clear()
+    _time_strings[seconds] = formatted
+    return formatted
+
+
+def format_time(time, precision=_second):
     '''Formats timedelta/datetime/seconds
 
     >>> format_time('1')
@@ -217,6 +531,8 @@ def format_time(time, precision=datetime.timedelta(seconds=1)):
     '0:00:01'
     >>> format_time(1)
     '0:00:01'
+    >>> format_time(90061.5)
+    '1 day, 1:01:01'
     >>> format_time(datetime.datetime(2000, 1, 2, 3, 4, 5, 6))
     '2000-01-02 03:04:05'
     >>> format_time(datetime.date(2000, 1, 2))
@@ -231,6 +547,12 @@ def format_time(time, precision=datetime.timedelta(seconds=1)):
     TypeError: Unknown type ...
 
     '''
+    if isinstance(time, six.numeric_types) and precision == _second:
+        try:
+            return _format_seconds(six.long_int(time))
+        except OverflowError:  # pragma: no cover
+            return format_time(None)
+
     precision_seconds = precision.total_seconds()
 
     if isinstance(time, six.basestring + six.numeric_types):
@@ -245,6 +567,8 @@ def format_time(time, precision=datetime.timedelta(seconds=1)):
         seconds = seconds - (seconds % precision_seconds)
 
         return str(datetime.timedelta(seconds=seconds))
+    elif isinstance(time, datetime.datetime) and precision == _second:
+        return str(time.replace(microsecond=0))
     elif isinstance(time, datetime.datetime):
         # Python 2 doesn't have the timestamp method
         seconds = timestamp(time)
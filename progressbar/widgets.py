@@ -12,6 +12,7 @@ import sys
 from python_utils import converters
 
 from . import base
+from . import estimators
 from . import six
 from . import utils
 
@@ -30,6 +31,14 @@ def string_or_lambda(input_):
         return input_
 
 
+def default_prefixes(base):
+    '''Returns the prefixes for the powers of `base`'''
+    if base == 1000:
+        return utils.DECIMAL_PREFIXES
+    else:
+        return utils.BINARY_PREFIXES
+
+
 def create_marker(marker):
     def _marker(progress, data, width):
         if progress.max_value is not base.UnknownLength \
@@ -110,8 +119,19 @@ class WidgetBase(object):
     WARNING: Widgets can be shared between multiple progressbars so any state
     information specific to a progressbar should be stored within the
     progressbar instead of the widget.
+
+    The `depends` declare the inputs the output of the widget depends on,
+    the progressbar reuses the previous output while they are unchanged.
+    The inputs are `value`, `max_value`, `percentage`, `elapsed` (seconds),
+    `finished`, `term_width` and `dynamic_messages`, an input can be given
+    as a `(name, granularity)` tuple as well. `None` means the widget is
+    called for every frame. Widgets with a format only use the `depends`
+    when the format is the `DEFAULT_FORMAT` and subclasses which override
+    `__call__` have to declare their own `depends`.
     '''
 
+    depends = None
+
     def __init__(self, **kwargs):
         pass
 
@@ -192,7 +212,12 @@ class FormatLabel(FormatWidgetMixin, WidthWidgetMixin):
         if not self.check_size(progress):
             return ''
 
+        format = kwargs.get('format') or self.format
         for name, (key, transform) in self.mapping.items():
+            # Skip the (possibly expensive) values the format doesn't use
+            if '(' + name + ')' not in format:
+                continue
+
             try:
                 if transform is None:
                     data[name] = data[key]
@@ -207,7 +232,10 @@ class FormatLabel(FormatWidgetMixin, WidthWidgetMixin):
 class Timer(FormatLabel, TimeSensitiveWidgetBase):
     '''WidgetBase which displays the elapsed seconds.'''
 
-    def __init__(self, format='Elapsed Time: %(elapsed)s', **kwargs):
+    DEFAULT_FORMAT = 'Elapsed Time: %(elapsed)s'
+    depends = (('elapsed', 1),)
+
+    def __init__(self, format=DEFAULT_FORMAT, **kwargs):
         FormatLabel.__init__(self, format=format, **kwargs)
         TimeSensitiveWidgetBase.__init__(self, **kwargs)
 
@@ -220,35 +248,71 @@ class SamplesMixin(object):
         self.samples = samples
         self.key_prefix = (self.__class__.__name__ or key_prefix) + '_'
 
+    def _get_buffer(self, progress, name):
+        key = self.key_prefix + name
+        try:
+            return progress.extra[key]
+        except KeyError:
+            buffer = progress.extra[key] = utils.RingBuffer(int(self.samples))
+            return buffer
+
     def get_sample_times(self, progress, data):
-        return progress.extra.setdefault(self.key_prefix + 'sample_times', [])
+        return self._get_buffer(progress, 'sample_times')
 
     def get_sample_values(self, progress, data):
-        return progress.extra.setdefault(self.key_prefix + 'sample_values', [])
+        return self._get_buffer(progress, 'sample_values')
 
     def __call__(self, progress, data):
         sample_times = self.get_sample_times(progress, data)
         sample_values = self.get_sample_values(progress, data)
 
-        if sample_times:
-            sample_time = sample_times[-1]
-        else:
-            sample_time = datetime.datetime.min
-
-        if progress.last_update_time - sample_time > self.INTERVAL:
-            # Add a sample but limit the size to `num_samples`
-            sample_times.append(progress.last_update_time)
+        # The sample times are `utils.clock()` floats, just like the
+        # progressbar's internal times
+        now = progress._last_update_time
+        if not sample_times or \
+                now - sample_times[-1] > self.INTERVAL.total_seconds():
+            # Add a sample, the ring buffers drop the oldest sample when
+            # they contain `samples` items
+            sample_times.append(now)
             sample_values.append(progress.value)
 
-            if len(sample_times) > self.samples:
-                sample_times.pop(0)
-                sample_values.pop(0)
-
         return sample_times, sample_values
 
 
-class ETA(Timer):
-    '''WidgetBase which attempts to estimate the time of arrival.'''
+class EstimatorMixin(object):
+    '''Mixin to estimate the rate with one of the `estimators`
+
+    The `estimator` is a class (or any callable) which returns a new
+    `estimators.Estimator`, every progressbar gets its own estimator.
+    '''
+
+    def __init__(self, estimator=None, **kwargs):
+        self.estimator = estimator
+
+    def get_estimator(self, progress):
+        # Keyed by widget so widgets with different estimators never share
+        key = '%s_estimator_%x' % (self.__class__.__name__, id(self))
+        try:
+            return progress.extra[key]
+        except KeyError:
+            estimator = progress.extra[key] = self.estimator()
+            return estimator
+
+    def estimate_rate(self, progress):
+        '''Adds the current value as a sample and returns the estimated rate
+        in value per second or `None` if it can't be estimated yet'''
+        estimator = self.get_estimator(progress)
+        if progress.value is not None:
+            estimator.add(progress._last_update_time, progress.value)
+        return estimator.rate()
+
+
+class ETA(Timer, EstimatorMixin):
+    '''WidgetBase which attempts to estimate the time of arrival.
+
+    Without an `estimator` the ETA is based on the average speed since the
+    start, see the `estimators` module for the alternatives.
+    '''
 
     def __init__(
             self,
@@ -260,6 +324,7 @@ class ETA(Timer):
             **kwargs):
 
         Timer.__init__(self, **kwargs)
+        EstimatorMixin.__init__(self, **kwargs)
         self.format_not_started = format_not_started
         self.format_finished = format_finished
         self.format = format
@@ -281,6 +346,13 @@ class ETA(Timer):
     def __call__(self, progress, data, value=None, elapsed=None):
         '''Updates the widget to show the ETA or total time when finished.'''
 
+        if value is None and self.estimator:
+            rate = self.estimate_rate(progress)
+            if rate:
+                # Processing `rate` items per second takes 1 second per `rate`
+                # items
+                value, elapsed = rate, 1
+
         if value is None:
             value = data['value']
 
@@ -319,7 +391,8 @@ class AbsoluteETA(ETA):
 
     def _calculate_eta(self, progress, data, value, elapsed):
         eta_seconds = ETA._calculate_eta(self, progress, data, value, elapsed)
-        now = datetime.datetime.now()
+        # The time of this frame, from the progressbar's clock
+        now = data['last_update_time']
         try:
             return now + datetime.timedelta(seconds=eta_seconds)
         except OverflowError:  # pragma: no cover
@@ -332,6 +405,7 @@ class AbsoluteETA(ETA):
             format='Estimated finish time: %(eta)s',
             **kwargs):
         Timer.__init__(self, **kwargs)
+        EstimatorMixin.__init__(self, **kwargs)
         self.format_not_started = format_not_started
         self.format_finished = format_finished
         self.format = format
@@ -341,7 +415,8 @@ class AdaptiveETA(ETA, SamplesMixin):
     '''WidgetBase which attempts to estimate the time of arrival.
 
     Uses a sampled average of the speed based on the 10 last updates.
-    Very convenient for resuming the progress halfway.
+    Very convenient for resuming the progress halfway. The samples are not
+    used when an `estimator` is given.
     '''
 
     def __init__(self, **kwargs):
@@ -349,6 +424,9 @@ class AdaptiveETA(ETA, SamplesMixin):
         SamplesMixin.__init__(self, **kwargs)
 
     def __call__(self, progress, data):
+        if self.estimator:
+            return ETA.__call__(self, progress, data)
+
         times, values = SamplesMixin.__call__(self, progress, data)
 
         if len(times) <= 1:
@@ -357,7 +435,7 @@ class AdaptiveETA(ETA, SamplesMixin):
             elapsed = 0
         else:
             value = values[-1] - values[0]
-            elapsed = utils.timedelta_to_seconds(times[-1] - times[0])
+            elapsed = times[-1] - times[0]
 
         return ETA.__call__(self, progress, data, value=value, elapsed=elapsed)
 
@@ -368,22 +446,28 @@ class DataSize(FormatWidgetMixin):
 
     Automatically formats the value (assumed to be a count of bytes) with an
     appropriate sized unit, based on the IEC binary prefixes (powers of 1024).
+    With `base=1000` the SI decimal prefixes (kB, MB, etc.) are used.
     '''
 
+    DEFAULT_FORMAT = '%(scaled)5.1f %(prefix)s%(unit)s'
+    # Replaced by the actual variable in `__init__`
+    depends = ('value',)
+
     def __init__(
-            self, variable='value',
-            format='%(scaled)5.1f %(prefix)s%(unit)s', unit='B',
-            prefixes=('', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei', 'Zi', 'Yi'),
-            **kwargs):
+            self, variable='value', format=DEFAULT_FORMAT, unit='B',
+            prefixes=None, base=1024, **kwargs):
         self.variable = variable
         self.unit = unit
-        self.prefixes = prefixes
+        self.base = base
+        self.prefixes = prefixes or default_prefixes(base)
+        self.depends = (variable,)
         FormatWidgetMixin.__init__(self, format=format, **kwargs)
 
     def __call__(self, progress, data):
         value = data[self.variable]
         if value is not None:
-            scaled, power = utils.scale_1024(value, len(self.prefixes))
+            scaled, power = utils.scale(
+                value, len(self.prefixes), self.base)
         else:
             scaled = power = 0
 
@@ -394,30 +478,46 @@ class DataSize(FormatWidgetMixin):
         return FormatWidgetMixin.__call__(self, progress, data)
 
 
-class FileTransferSpeed(FormatWidgetMixin, TimeSensitiveWidgetBase):
+class FileTransferSpeed(FormatWidgetMixin, TimeSensitiveWidgetBase,
+                        EstimatorMixin):
     '''
     WidgetBase for showing the transfer speed (useful for file transfers).
+    With `base=1000` the SI decimal prefixes (kB, MB, etc.) are used.
+
+    Without an `estimator` the speed is the average since the start, see the
+    `estimators` module for the alternatives.
     '''
 
     def __init__(
             self, format='%(scaled)5.1f %(prefix)s%(unit)-s/s',
             inverse_format='%(scaled)5.1f s/%(prefix)s%(unit)-s', unit='B',
-            prefixes=('', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei', 'Zi', 'Yi'),
-            **kwargs):
+            prefixes=None, base=1024, **kwargs):
         self.unit = unit
-        self.prefixes = prefixes
+        self.base = base
+        self.prefixes = prefixes or default_prefixes(base)
         self.inverse_format = inverse_format
         FormatWidgetMixin.__init__(self, format=format, **kwargs)
         TimeSensitiveWidgetBase.__init__(self, **kwargs)
+        EstimatorMixin.__init__(self, **kwargs)
 
     def _speed(self, value, elapsed):
         speed = float(value) / elapsed
-        return utils.scale_1024(speed, len(self.prefixes))
+        return utils.scale(speed, len(self.prefixes), self.base)
 
     def __call__(self, progress, data, value=None, total_seconds_elapsed=None):
         '''Updates the widget with the current SI prefixed speed.'''
-        value = data['value'] or value
-        elapsed = data['total_seconds_elapsed'] or total_seconds_elapsed
+        if value is None and self.estimator:
+            rate = self.estimate_rate(progress)
+            if rate is not None:
+                value, total_seconds_elapsed = rate, 1
+
+        if value is None:
+            value = data['value']
+
+        if total_seconds_elapsed is None:
+            elapsed = data['total_seconds_elapsed']
+        else:
+            elapsed = total_seconds_elapsed
 
         if value is not None and elapsed is not None \
                 and elapsed > 2e-6 and value > 2e-6:  # =~ 0
@@ -448,6 +548,9 @@ class AdaptiveTransferSpeed(FileTransferSpeed, SamplesMixin):
         SamplesMixin.__init__(self, **kwargs)
 
     def __call__(self, progress, data):
+        if self.estimator:
+            return FileTransferSpeed.__call__(self, progress, data)
+
         times, values = SamplesMixin.__call__(self, progress, data)
         if len(times) <= 1:
             # No samples so just return the normal transfer speed calculation
@@ -455,11 +558,57 @@ class AdaptiveTransferSpeed(FileTransferSpeed, SamplesMixin):
             elapsed = None
         else:
             value = values[-1] - values[0]
-            elapsed = utils.timedelta_to_seconds(times[-1] - times[0])
+            elapsed = times[-1] - times[0]
 
         return FileTransferSpeed.__call__(self, progress, data, value, elapsed)
 
 
+class ItemLatency(FormatWidgetMixin, TimeSensitiveWidgetBase):
+    '''Displays percentiles of the time per item, this requires a
+    progressbar with `time_items=True`
+
+    Variables available:
+     - p50, p95, p99: The formatted time per item at the percentiles
+    '''
+
+    def __init__(self, format='p50: %(p50)s p95: %(p95)s p99: %(p99)s',
+                 format_not_started='p50: -- p95: -- p99: --',
+                 quantiles=(50, 95, 99), **kwargs):
+        self.format_not_started = format_not_started
+        self.quantiles = quantiles
+        FormatWidgetMixin.__init__(self, format=format, **kwargs)
+        TimeSensitiveWidgetBase.__init__(self, **kwargs)
+
+    @staticmethod
+    def format_latency(seconds):
+        '''Formats the time per item with an appropriate unit
+
+        >>> str(ItemLatency.format_latency(0.0000123))
+        '12.3us'
+        >>> str(ItemLatency.format_latency(0.0123))
+        '12.3ms'
+        >>> str(ItemLatency.format_latency(12.3))
+        '12.30s'
+        '''
+        if seconds < 0.001:
+            return '%.1fus' % (seconds * 1e6)
+        elif seconds < 1:
+            return '%.1fms' % (seconds * 1e3)
+        else:
+            return '%.2fs' % seconds
+
+    def __call__(self, progress, data):
+        if not progress.latencies:
+            return FormatWidgetMixin.__call__(
+                self, progress, data, self.format_not_started)
+
+        for quantile in self.quantiles:
+            data['p%d' % quantile] = self.format_latency(
+                progress.latencies.quantile(quantile / 100))
+
+        return FormatWidgetMixin.__call__(self, progress, data)
+
+
 class AnimatedMarker(WidgetBase):
     '''An animated marker for the progress bar which defaults to appear as if
     it were rotating.
@@ -487,7 +636,10 @@ RotatingMarker = AnimatedMarker
 class Counter(FormatWidgetMixin, WidgetBase):
     '''Displays the current count'''
 
-    def __init__(self, format='%(value)d', **kwargs):
+    DEFAULT_FORMAT = '%(value)d'
+    depends = ('value',)
+
+    def __init__(self, format=DEFAULT_FORMAT, **kwargs):
         FormatWidgetMixin.__init__(self, format=format, **kwargs)
         WidgetBase.__init__(self, format=format, **kwargs)
 
@@ -495,7 +647,10 @@ class Counter(FormatWidgetMixin, WidgetBase):
 class Percentage(FormatWidgetMixin, WidgetBase):
     '''Displays the current percentage as a number with a percent sign.'''
 
-    def __init__(self, format='%(percentage)3d%%', **kwargs):
+    DEFAULT_FORMAT = '%(percentage)3d%%'
+    depends = (('percentage', 1),)
+
+    def __init__(self, format=DEFAULT_FORMAT, **kwargs):
         FormatWidgetMixin.__init__(self, format=format, **kwargs)
         WidgetBase.__init__(self, format=format, **kwargs)
 
@@ -512,6 +667,7 @@ class SimpleProgress(FormatWidgetMixin, WidgetBase):
     '''Returns progress as a count of the total (e.g.: "5 of 47")'''
 
     DEFAULT_FORMAT = '%(value_s)s of %(max_value_s)s'
+    depends = ('value', 'max_value')
 
     def __init__(self, format=DEFAULT_FORMAT, max_width=None, **kwargs):
         self.max_width = dict(default=max_width)
@@ -599,6 +755,62 @@ class Bar(AutoWidthWidgetBase):
         return left + marker + right
 
 
+class SmoothBar(AutoWidthWidgetBase):
+    '''A progress bar which stretches to fill the line and uses the Unicode
+    eighth blocks to show 8 steps per character.
+
+    The bar strings are built once per width so rendering a frame only
+    slices the right part out of them.
+    '''
+
+    GLYPHS = ' \u258f\u258e\u258d\u258c\u258b\u258a\u2589\u2588'
+
+    def __init__(self, left='|', right='|', glyphs=GLYPHS, **kwargs):
+        '''Creates a smooth progress bar.
+
+        left - string to use as a left border
+        right - string to use as a right border
+        glyphs - the characters from an empty to a full character
+        '''
+        self.left = converters.to_unicode(left)
+        self.right = converters.to_unicode(right)
+        self.glyphs = converters.to_unicode(glyphs)
+        # The number of steps a single character can show
+        self.resolution = len(self.glyphs) - 1
+        self._tables = {}
+        AutoWidthWidgetBase.__init__(self, **kwargs)
+
+    def get_table(self, width):
+        '''Returns a string per partial glyph with `width` full glyphs
+        followed by the partial glyph and `width` empty glyphs'''
+        try:
+            return self._tables[width]
+        except KeyError:
+            full = self.glyphs[-1] * width
+            empty = self.glyphs[0] * width
+            table = self._tables[width] = [
+                full + glyph + empty for glyph in self.glyphs[:-1]]
+            return table
+
+    def __call__(self, progress, data, width):
+        '''Updates the progress bar'''
+        width -= len(self.left) + len(self.right)
+        if width <= 0:
+            return self.left + self.right
+
+        total = width * self.resolution
+        try:
+            steps = int(total * (data['value'] - progress.min_value) / (
+                data['max_value'] - progress.min_value))
+        except (TypeError, ZeroDivisionError):
+            # Unknown length or an empty range
+            steps = 0 if data['max_value'] is base.UnknownLength else total
+        steps = min(max(steps, 0), total)
+        cells, step = divmod(steps, self.resolution)
+        bar = self.get_table(width)[step][width - cells:2 * width - cells]
+        return self.left + bar + self.right
+
+
 class ReverseBar(Bar):
     '''A bar which has a marker that goes from right to left'''
 
@@ -648,6 +860,56 @@ class BouncingBar(Bar, TimeSensitiveWidgetBase):
         return left + marker + right
 
 
+class Sparkline(TimeSensitiveWidgetBase, AutoWidthWidgetBase):
+    '''Shows the throughput history as a line of block characters which
+    stretches to fill the line, the newest period is on the right.
+
+    The throughput is averaged per `bucket_size` seconds and the last
+    `buckets` periods are kept, so a stall shows up as a drop to the
+    lowest mark.
+    '''
+
+    def __init__(self, bucket_size=1., buckets=200,
+                 marks=' \u2581\u2582\u2583\u2584\u2585\u2586\u2587\u2588',
+                 **kwargs):
+        '''Creates a sparkline of the throughput.
+
+        bucket_size - the number of seconds to average the throughput over
+        buckets - the number of periods to keep
+        marks - the characters from no throughput to the highest throughput
+        '''
+        self.bucket_size = bucket_size
+        self.buckets = buckets
+        self.marks = converters.to_unicode(marks)
+        AutoWidthWidgetBase.__init__(self, **kwargs)
+
+    def get_history(self, progress):
+        key = '%s_history_%x' % (self.__class__.__name__, id(self))
+        try:
+            return progress.extra[key]
+        except KeyError:
+            history = progress.extra[key] = estimators.RateHistory(
+                self.bucket_size, self.buckets)
+            return history
+
+    def __call__(self, progress, data, width):
+        # The history does its own bucketing so every frame is a sample
+        history = self.get_history(progress)
+        history.add(progress._last_update_time, progress.value)
+
+        rates = history.history
+        recent = [rates[i] for i in range(max(len(rates) - width, 0),
+                                          len(rates))]
+        highest = max(recent) if recent else 0
+        if highest <= 0:
+            return ' ' * width
+
+        steps = len(self.marks) - 1
+        line = ''.join(self.marks[int(max(rate, 0) / highest * steps)]
+                       for rate in recent)
+        return line.rjust(width)
+
+
 class FormatCustomText(FormatWidgetMixin, WidthWidgetMixin):
     mapping = {}
 
@@ -0,0 +1,72 @@
+import pytest
+
+import progressbar
+
+
+def test_default_backend():
+    p = progressbar.ProgressBar(fd=progressbar.six.StringIO())
+    assert isinstance(p.backend, progressbar.LogBackend)
+
+    p = progressbar.ProgressBar(fd=progressbar.six.StringIO(),
+                                line_mode=False)
+    assert isinstance(p.backend, progressbar.TerminalBackend)
+    assert not p.line_mode
+
+
+def test_memory_backend():
+    backend = progressbar.MemoryBackend()
+    p = progressbar.ProgressBar(
+        max_value=10, backend=backend, term_width=20,
+        widgets=[progressbar.Percentage()])
+    for i in p(range(10)):
+        pass
+
+    assert backend.finished
+    assert backend.lines[0] == 'N/A%'.ljust(20)
+    assert backend.lines[-1] == '100%'.ljust(20)
+    assert len(backend.lines) == p.updates + 1
+
+
+def test_null_backend():
+    fd = progressbar.six.StringIO()
+    p = progressbar.ProgressBar(
+        max_value=10, fd=fd, backend=progressbar.NullBackend())
+    with p:
+        for i in range(10):
+            p.update(i)
+
+    assert p.value == 10
+    assert p.updates == 0
+    assert not fd.getvalue()
+
+
+def test_null_bar():
+    p = progressbar.NullBar()
+    assert isinstance(p.backend, progressbar.NullBackend)
+    assert list(p(range(3))) == [0, 1, 2]
+
+
+def test_backend_hooks():
+    calls = []
+
+    class Backend(progressbar.backends.Backend):
+        def start(self, progress):
+            calls.append('start')
+
+        def clear(self, progress):
+            calls.append('clear')
+
+        def failure(self, progress, exc_type, exc_value):
+            calls.append(exc_type.__name__)
+
+        def finish(self, progress):
+            calls.append('finish')
+
+    with pytest.raises(RuntimeError):
+        with progressbar.ProgressBar(max_value=10, backend=Backend(),
+                                     redirect_stdout=True) as p:
+            print('spam')
+            p.update(5)
+            raise RuntimeError()
+
+    assert calls == ['start', 'clear', 'RuntimeError', 'finish']
@@ -1,3 +1,4 @@
+import pytest
 import progressbar
 import logging
 
@@ -18,3 +19,18 @@ def pytest_configure(config):
     progressbar.ProgressBar._MINIMUM_UPDATE_INTERVAL = 0.000001
 
 
+class FakeClock(object):
+    '''Replaces `utils.clock`, the time only changes by setting `now`'''
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(progressbar.utils, 'clock', clock)
+    return clock
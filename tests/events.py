@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import progressbar
+
+
+def read_events(fd):
+    return [json.loads(line) for line in fd.getvalue().splitlines()]
+
+
+def test_json_events(fake_clock):
+    fd = progressbar.six.StringIO()
+    p = progressbar.JsonEventBar(max_value=100, fd=fd, flush_interval=60)
+
+    with p:
+        for i in range(100):
+            fake_clock.now += 0.5
+            p.update(i)
+
+    events = read_events(fd)
+    assert events[0]['event'] == 'start'
+    assert events[-1]['event'] == 'finish'
+    assert events[-1]['value'] == 100
+    assert events[-1]['percentage'] == 100
+
+    # Only values which change the percentage are sent, the initial value
+    # is sent by the start event
+    assert events[0]['value'] == 0
+    progress = [event for event in events if event['event'] == 'progress']
+    assert [event['value'] for event in progress] == list(range(1, 100))
+    assert progress[-1]['rate'] == pytest.approx(99 / 50.)
+    assert progress[-1]['eta'] == pytest.approx(1 / (99 / 50.))
+    assert progress[-1]['total_seconds_elapsed'] == 50
+
+
+def test_json_events_failure():
+    fd = progressbar.six.StringIO()
+    with pytest.raises(RuntimeError):
+        with progressbar.JsonEventBar(max_value=progressbar.UnknownLength,
+                                      fd=fd) as p:
+            p.update(5)
+            raise RuntimeError('spam')
+
+    events = read_events(fd)
+    assert [event['event'] for event in events] == [
+        'start', 'progress', 'failure']
+    assert events[-1]['error'] == 'RuntimeError: spam'
+    assert events[-1]['max_value'] is None
+    assert events[-1]['eta'] is None
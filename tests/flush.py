@@ -16,3 +16,54 @@ def test_flush():
             time.sleep(0.1)
         print('post-updates', p.updates)
 
+
+def test_update_interval():
+    '''Only values outside of the last interval should be redrawn'''
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.Percentage(), progressbar.Bar()],
+        max_value=1000, term_width=50).start()
+    p._MINIMUM_UPDATE_INTERVAL = 0
+
+    updates = p.updates
+    for i in range(10):
+        p.update(i)
+    assert p.updates == updates
+    assert p.next_update == 10
+
+    p.update(10)
+    assert p.updates == updates + 1
+
+    # Going back redraws as well
+    p.update(5)
+    assert p.updates == updates + 2
+    p.finish()
+
+
+def test_start_draws_initial_frame(monkeypatch):
+    '''The minimum update interval should not throttle the initial frame'''
+    monkeypatch.setattr(progressbar.ProgressBar, '_MINIMUM_UPDATE_INTERVAL',
+                        0.05)
+    backend = progressbar.MemoryBackend()
+    p = progressbar.ProgressBar(max_value=10, backend=backend).start()
+    assert p.updates == 1
+    assert len(backend.lines) == 1
+    p.finish()
+
+
+def test_update_interval_without_clock(monkeypatch):
+    '''Values within the interval of the last redraw skip the clock'''
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=1000).start()
+    p.update(100)
+
+    calls = []
+
+    def clock():
+        calls.append(None)
+        return time.time()
+
+    monkeypatch.setattr(progressbar.utils, 'clock', clock)
+    for i in range(1000):
+        p.update(100)
+    assert not calls
+    p.finish()
@@ -55,3 +55,79 @@ def test_adding_value():
     with pytest.raises(ValueError):
         p += 5
 
+
+def test_adaptive_stride():
+    '''The value should be exact even when updates are skipped'''
+    p = progressbar.ProgressBar(max_value=10000)
+    p._MINIMUM_UPDATE_INTERVAL = 1
+    for i, item in enumerate(p(range(10000))):
+        assert p.value == i
+    assert p._stride > 1
+    assert p.value == 10000
+
+
+def test_item_latencies(fake_clock):
+    widget = progressbar.ItemLatency()
+    p = progressbar.ProgressBar(widgets=[widget], time_items=True)
+    assert widget(p, p.data()) == 'p50: -- p95: -- p99: --'
+
+    # One slow item in a hundred
+    for i in p(range(101)):
+        fake_clock.now += 1 if i == 50 else 0.01
+    summary = p.latency_summary()
+    assert summary['count'] == 100
+    assert summary['p50'] == pytest.approx(0.01, rel=0.01)
+    assert summary['p99'] == pytest.approx(0.01, rel=0.01)
+    assert p.latencies.max == pytest.approx(1)
+    assert widget(p, p.data()) == 'p50: 10.0ms p95: 10.0ms p99: 10.0ms'
+
+
+def test_disabled():
+    p = progressbar.ProgressBar(disabled=True)
+    items = [1, 2, 3]
+    iterator = p(items)
+    assert iterator is not p
+    assert list(iterator) == items
+
+    assert p.start() is p
+    p.update(5)
+    p.finish()
+    assert p.value == 0
+    assert p._start_time is None
+
+
+def test_disabled_environ(monkeypatch):
+    monkeypatch.setenv('PROGRESSBAR_DISABLE', '1')
+    assert progressbar.ProgressBar().disabled
+    assert not progressbar.ProgressBar(disabled=False).disabled
+
+    # Explicitly chosen backends keep working
+    assert not progressbar.JsonEventBar().disabled
+    assert not progressbar.ProgressBar(
+        backend=progressbar.MemoryBackend()).disabled
+
+    monkeypatch.setenv('PROGRESSBAR_DISABLE', '0')
+    assert not progressbar.ProgressBar().disabled
+
+
+def test_adaptive_stride_slowdown(fake_clock):
+    '''A slowdown after a fast phase should still be redrawn on time'''
+    p = progressbar.ProgressBar(max_value=100000)
+    p._MINIMUM_UPDATE_INTERVAL = 0.05
+
+    def items():
+        for i in range(99900):
+            fake_clock.now += 0.000001
+            yield i
+        for i in range(100):
+            fake_clock.now += 0.1
+            yield i
+
+    for i, item in enumerate(p(items())):
+        if i == 99900:
+            assert p._stride > 1000
+            updates = p.updates
+
+    # Every 16 items are checked so the slow phase is redrawn regularly
+    assert p.updates - updates > 5
+    assert p._stride == 1
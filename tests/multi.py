@@ -0,0 +1,112 @@
+from __future__ import print_function
+
+import sys
+import signal
+import threading
+import progressbar
+
+
+def test_multi_bar():
+    fd = progressbar.six.StringIO()
+    multi = progressbar.MultiBar(fd=fd, term_width=20)
+    bars = [multi.add(progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=10))
+        for _ in range(3)]
+    multi.start()
+
+    for i in range(10):
+        for bar in bars:
+            bar.update(i)
+
+    # Updating the bars only stores the value
+    assert all(bar.updates == 0 for bar in bars)
+
+    for bar in bars:
+        bar.finish()
+    multi.finish()
+
+    output = fd.getvalue()
+    assert output.count('100%') == 3
+    assert all(bar.value == 10 for bar in bars)
+    assert multi._lines == [bar._format_line() for bar in bars]
+
+
+def test_multi_bar_render():
+    fd = progressbar.six.StringIO()
+    multi = progressbar.MultiBar(fd=fd, term_width=10)
+    first = multi.add(progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=10)).start()
+    second = multi.add(progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=10)).start()
+    multi.render(force=True)
+
+    # Only the changed bar is redrawn, the cursor ends below the bars
+    fd.truncate(0)
+    fd.seek(0)
+    second.update(5)
+    multi.render()
+    assert fd.getvalue() == '\x1b[1A\r 50%      \x1b[1B\r'
+
+    # Nothing changed so nothing is written
+    fd.truncate(0)
+    fd.seek(0)
+    multi.render()
+    assert fd.getvalue() == ''
+
+    first.finish()
+    second.finish()
+    multi.finish()
+
+
+def test_multi_bar_redirect(monkeypatch):
+    stdout = progressbar.six.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    multi = progressbar.MultiBar(fd=progressbar.six.StringIO(),
+                                 term_width=20)
+    p = multi.add(progressbar.ProgressBar(max_value=10,
+                                          redirect_stdout=True)).start()
+    assert sys.stdout is not stdout
+    print('spam')
+    p.finish()
+    multi.finish()
+
+    assert sys.stdout is stdout
+    assert stdout.getvalue() == 'spam\n'
+
+
+def test_multi_bar_thread_safe():
+    multi = progressbar.MultiBar(fd=progressbar.six.StringIO(),
+                                 term_width=20)
+    p = multi.add(progressbar.ProgressBar(
+        widgets=[progressbar.Counter()], max_value=4000,
+        thread_safe=True)).start()
+
+    def worker(bar):
+        for i in range(1000):
+            bar += 1
+
+    threads = [threading.Thread(target=worker, args=(p,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    multi.render(force=True)
+    assert multi._lines == ['4000'.ljust(20)]
+    p.finish()
+    multi.finish()
+
+
+def test_multi_bar_resize_handler():
+    handler = signal.getsignal(signal.SIGWINCH)
+    try:
+        multi = progressbar.MultiBar(fd=progressbar.six.StringIO())
+        bars = [progressbar.ProgressBar(fd=progressbar.six.StringIO(),
+                                        line_mode=False)
+                for _ in range(3)]
+        for p in bars:
+            multi.add(p)
+        assert signal.getsignal(signal.SIGWINCH) == multi._handle_resize
+        multi.finish()
+    finally:
+        signal.signal(signal.SIGWINCH, handler)
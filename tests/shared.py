@@ -0,0 +1,54 @@
+import os
+import tempfile
+import multiprocessing
+
+import pytest
+import progressbar
+
+
+def _worker(counter):
+    for i in range(100):
+        counter += 1
+
+
+@pytest.fixture
+def fork_context():
+    if not hasattr(os, 'fork') or \
+            not hasattr(multiprocessing, 'get_context'):  # pragma: no cover
+        pytest.skip('Forking processes is not supported')
+    return multiprocessing.get_context('fork')
+
+
+def test_shared_counter(fork_context):
+    p = progressbar.ProgressBar(max_value=400)
+    p.start()
+    counter = p.shared_counter()
+    processes = [fork_context.Process(target=_worker, args=(counter,))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    p.update()
+    assert p.value == 400
+    p.finish()
+
+
+def test_forked_bar_does_not_write(fork_context):
+    with tempfile.TemporaryFile('w+') as fd:
+        p = progressbar.ProgressBar(max_value=10, fd=fd)
+        p.start()
+        fd.flush()
+        written = fd.tell()
+
+        def child():
+            p.update(5, force=True)
+            p.finish()
+
+        process = fork_context.Process(target=child)
+        process.start()
+        process.join()
+
+        fd.seek(0, os.SEEK_END)
+        assert fd.tell() == written
@@ -25,3 +25,26 @@ def test_file_transfer_speed(total_seconds_elapsed, value, expected):
         value=value,
     )) == expected
 
+
+@pytest.mark.parametrize('value,expected', [
+    (999, '999.0 B/s'),
+    (1000, '  1.0 kB/s'),
+    (10 ** 6, '  1.0 MB/s'),
+    (2 * 10 ** 24, '  2.0 YB/s'),
+])
+def test_file_transfer_speed_decimal(value, expected):
+    widget = progressbar.FileTransferSpeed(base=1000)
+    assert widget(None, dict(
+        total_seconds_elapsed=1,
+        value=value,
+    )) == expected
+
+
+@pytest.mark.parametrize('value,expected', [
+    (1023, '1023.0 B'),
+    (2 ** 50, '  1.0 PiB'),
+    (2 ** 50 - 1, '1024.0 TiB'),
+])
+def test_data_size(value, expected):
+    widget = progressbar.DataSize()
+    assert widget(None, dict(value=value)) == expected
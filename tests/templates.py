@@ -0,0 +1,58 @@
+import pytest
+
+import progressbar
+
+
+def test_template():
+    template = progressbar.Template(
+        '{{{value}/{max_value}}} {percentage:3.0f}% {bar} {counter}',
+        counter=progressbar.Counter('%(value)03d'))
+    assert template.variables == ['value', 'max_value', 'percentage']
+    p = progressbar.ProgressBar(widgets=template, max_value=10,
+                                term_width=30).start()
+    p.update(5)
+    assert p._format_line() == '{5/10}  50% |######      | 005'
+    p.finish()
+
+
+def test_template_matches_widgets():
+    widgets = [
+        progressbar.Percentage(), ' ', progressbar.Bar(),
+        ' ', progressbar.SmoothBar(), ' ', progressbar.Timer(),
+    ]
+    template = progressbar.Template(
+        '{percentage:3.0f}% {bar} {smooth_bar} {timer}',
+        timer=widgets[-1])
+
+    for layout in widgets, template:
+        p = progressbar.ProgressBar(widgets=layout, max_value=100,
+                                    term_width=60).start()
+        p.update(33)
+        if layout is widgets:
+            expected = p._format_line()
+        else:
+            assert p._format_line() == expected
+            assert p._get_render_plan().resolution == 8
+        p.finish()
+
+
+def test_template_unknown_field():
+    with pytest.raises(ValueError) as excinfo:
+        progressbar.Template('{value} {spam.eggs}')
+    assert "'spam'" in str(excinfo.value)
+
+
+def test_template_unknown_length():
+    '''Unknown variables are shown as N/A like the widgets do'''
+    lines = []
+    counter = progressbar.Counter('%(value)4d')
+    for widgets in (
+            progressbar.Template('{percentage:3.0f}% {value:4d}'),
+            [progressbar.Percentage(), ' ', counter]):
+        p = progressbar.ProgressBar(widgets=widgets, term_width=20)
+        for i in p(iter(range(5))):
+            pass
+        lines.append(p._format_line())
+
+    assert lines[0].startswith('N/A%')
+    assert lines[0] == lines[1]
@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import os
 import sys
 import time
 import signal
@@ -138,3 +139,82 @@ def test_resize(monkeypatch):
     except ImportError:
         pass  # Skip on Windows
 
+
+def test_unchanged_line_not_written():
+    fd = progressbar.six.StringIO()
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=1000, term_width=20,
+        fd=fd)
+    p.start()
+    p.update(100, force=True)
+    written = fd.getvalue()
+
+    # 10.0% and 10.1% both render as 10%, the line shouldn't be rewritten
+    p.update(101, force=True)
+    assert fd.getvalue() == written
+
+    p.update(500, force=True)
+    assert fd.getvalue() != written
+    p.finish()
+
+
+def test_line_mode(fake_clock):
+    fd = progressbar.six.StringIO()
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=100, fd=fd,
+        term_width=20, line_interval=20, line_milestone=50).start()
+    assert p.line_mode
+
+    for i in range(100):
+        fake_clock.now += 1
+        p.update(i)
+    p.finish()
+
+    # The start, every 20 seconds or 50 percent and the final line
+    lines = fd.getvalue().split('\n')
+    assert lines == ['N/A%', ' 19%', ' 39%', ' 50%', ' 70%', ' 90%',
+                     '100%', '']
+
+
+def test_terminal_size_cache(monkeypatch):
+    sizes = []
+
+    def get_terminal_size(fd=None):
+        sizes.append(fd)
+        return 40 + len(sizes), 24
+
+    monkeypatch.setattr(progressbar.utils, '_terminal_sizes', {})
+    monkeypatch.setattr(progressbar.utils, '_get_terminal_size',
+                        get_terminal_size)
+
+    for i in range(3):
+        p = progressbar.ProgressBar(fd=progressbar.six.StringIO())
+        assert p.term_width == 41
+    assert sizes == [None]
+
+    # Only an actual resize detects the size again
+    p._handle_resize(signal.SIGWINCH)
+    assert p.term_width == 42
+    assert progressbar.utils.get_terminal_size() == (42, 24)
+    assert progressbar.utils.get_terminal_size(2) == (43, 24)
+    assert sizes == [None, None, 2]
+
+
+def test_terminal_size_resize_without_bar(monkeypatch):
+    '''Resizes while no bar is running should clear the cached size'''
+    width = [100]
+    monkeypatch.setattr(progressbar.utils, '_terminal_sizes', {})
+    monkeypatch.setattr(progressbar.utils, '_get_terminal_size',
+                        lambda fd=None: (width[0], 24))
+    handler = signal.getsignal(signal.SIGWINCH)
+    fd = progressbar.six.StringIO()
+    try:
+        p = progressbar.ProgressBar(fd=fd, line_mode=False).start()
+        assert p.term_width == 100
+        p.finish()
+
+        width[0] = 60
+        os.kill(os.getpid(), signal.SIGWINCH)
+        assert progressbar.ProgressBar(fd=fd).term_width == 60
+    finally:
+        signal.signal(signal.SIGWINCH, handler)
@@ -0,0 +1,13 @@
+import json
+
+
+def test_benchmarks(tmpdir):
+    import benchmarks
+    output = str(tmpdir.join('results.json'))
+    results = benchmarks.main(['-n', '10', '-r', '1', '-o', output])
+    assert 'update_default_widgets/real' in results
+    assert 'widget_Bar/fake' in results
+
+    benchmarks.main(['-n', '10', '-r', '1', '-c', output, 'iterate'])
+    with open(output) as fh:
+        assert json.load(fh)['results'] == results
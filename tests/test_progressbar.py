@@ -13,3 +13,11 @@ def test_examples_nullbar(monkeypatch):
     examples.non_interactive_sleep_factor = 10000
     for example in examples.examples:
         example()
+
+
+def test_examples_disabled(monkeypatch):
+    monkeypatch.setenv('PROGRESSBAR_DISABLE', '1')
+    import examples
+    monkeypatch.setattr(examples, 'non_interactive_sleep_factor', 10000)
+    for example in examples.examples:
+        example()
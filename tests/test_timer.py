@@ -42,3 +42,17 @@ def test_intervals():
     bar.update(3)
     assert bar.last_update_time != last_update_time
 
+
+def test_sub_second_update_time():
+    bar = progressbar.ProgressBar(max_value=100)
+    bar.start()
+
+    # The internal clock has sub-second precision and the datetime
+    # version should reflect that as well
+    bar._last_update_time = bar._start_time + 0.5
+    delta = bar.last_update_time - bar.start_time
+    assert abs(delta.total_seconds() - 0.5) < 0.001
+
+    last_update_time = bar.last_update_time
+    bar.last_update_time = last_update_time
+    assert bar.last_update_time == last_update_time
@@ -0,0 +1,110 @@
+import time
+import threading
+import progressbar
+
+
+def test_threaded():
+    p = progressbar.ProgressBar(max_value=10, threaded=True)
+    p.start()
+    assert p._render_thread.is_alive()
+
+    for i in range(10):
+        p.update(i)
+        assert p.value == i
+
+    p += 1
+    assert p.value == 10
+    p.finish()
+    assert p._render_thread is None
+
+
+def test_threaded_finish(monkeypatch):
+    '''The final state should be drawn even right after a frame'''
+    monkeypatch.setattr(progressbar.ProgressBar, '_MINIMUM_UPDATE_INTERVAL',
+                        0.05)
+    fd = progressbar.six.StringIO()
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.Percentage()], max_value=100, term_width=10,
+        fd=fd, line_mode=False, threaded=True).start()
+
+    for i in range(90):
+        p.update(i)
+    p.finish()
+    assert fd.getvalue().rstrip('\n').split('\r')[-1].strip() == '100%'
+
+
+def test_threaded_time_sensitive():
+    '''The render thread should keep redrawing while the caller blocks'''
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.Timer(), progressbar.BouncingBar()],
+        max_value=progressbar.UnknownLength, threaded=True)
+    p._MINIMUM_UPDATE_INTERVAL = 0.001
+    p.start()
+    updates = p.updates
+    time.sleep(0.3)
+    assert p.updates > updates
+    p.finish()
+
+
+def test_threaded_dynamic_messages():
+    p = progressbar.ProgressBar(
+        widgets=[progressbar.DynamicMessage('loss')],
+        max_value=10, threaded=True)
+    with p:
+        for i in range(10):
+            p.update(i, loss=i / 10.)
+
+
+def test_thread_safe():
+    p = progressbar.ProgressBar(max_value=8000, thread_safe=True)
+    p.start()
+
+    def worker(bar):
+        for i in range(1000):
+            bar += 1
+
+    threads = [threading.Thread(target=worker, args=(p,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    p.update()
+    assert p.value == 8000
+    assert len(p._shards) == 8
+
+    # Absolute updates still work and are combined with the counters
+    p.update(10)
+    assert p.value == 10
+    p += 5
+    p.update()
+    assert p.value == 15
+    p.finish()
+
+
+def test_thread_safe_not_started():
+    p = progressbar.ProgressBar(max_value=10, thread_safe=True)
+    p += 1
+    assert p.start_time is not None
+    assert p.value == 1
+    p.finish()
+
+
+def test_thread_safe_threaded():
+    p = progressbar.ProgressBar(max_value=4000, thread_safe=True,
+                                threaded=True)
+
+    def worker(bar):
+        for i in range(1000):
+            bar += 1
+
+    with p:
+        threads = [threading.Thread(target=worker, args=(p,))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        p._render_frame()
+        assert p.value == 4000
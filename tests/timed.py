@@ -1,3 +1,4 @@
+import pytest
 import time
 import datetime
 import progressbar
@@ -63,6 +64,21 @@ def test_adaptive_eta():
     p.finish()
 
 
+def test_adaptive_eta_sample_window():
+    widget = progressbar.AdaptiveETA(samples=3)
+    widget.INTERVAL = datetime.timedelta()
+    p = progressbar.ProgressBar(max_value=10, widgets=[widget])
+
+    p.start()
+    for i in range(10):
+        p.update(i, force=True)
+    times, values = progressbar.widgets.SamplesMixin.__call__(
+        widget, p, p.data())
+    assert len(times) == len(values) == 3
+    assert values[0] <= values[-1]
+    p.finish()
+
+
 def test_adaptive_transfer_speed():
     '''Testing (Adaptive)ETA when the value doesn't actually change'''
     widgets = [
@@ -109,3 +125,51 @@ def test_eta_not_available():
     bar = progressbar.ProgressBar(widgets=widgets)
     for i in bar(gen()):
         pass
+
+
+@pytest.mark.parametrize('estimator', [
+    progressbar.TimeWindowEstimator,
+    progressbar.EWMAEstimator,
+    progressbar.LinearRegressionEstimator,
+])
+def test_estimators(fake_clock, estimator):
+    widgets = [
+        progressbar.AdaptiveETA(estimator=estimator),
+        progressbar.FileTransferSpeed(estimator=estimator),
+    ]
+    p = progressbar.ProgressBar(max_value=100, widgets=widgets)
+
+    p.start()
+    for i in range(1, 50):
+        fake_clock.now += 1
+        p.update(i * 2, force=True)
+    assert widgets[0].estimate_rate(p) == pytest.approx(2)
+    assert widgets[0](p, p.data()) == 'ETA: 0:00:01'
+    assert widgets[1](p, p.data()).strip() == '2.0 B/s'
+    p.finish()
+
+
+def test_separate_estimators():
+    widgets = [
+        progressbar.ETA(estimator=progressbar.EWMAEstimator),
+        progressbar.ETA(estimator=progressbar.TimeWindowEstimator),
+    ]
+    p = progressbar.ProgressBar(max_value=10, widgets=widgets)
+    p.start()
+    assert isinstance(widgets[0].get_estimator(p),
+                      progressbar.EWMAEstimator)
+    assert isinstance(widgets[1].get_estimator(p),
+                      progressbar.TimeWindowEstimator)
+    p.finish()
+
+
+def test_large_sample_buffer():
+    '''Huge sample counts should only use memory for the stored samples'''
+    p = progressbar.ProgressBar(max_value=10 ** 9, widgets=[
+        progressbar.AdaptiveETA(samples=10 ** 7)])
+    p.start()
+    p.update(10)
+    buffer = p.extra['AdaptiveETA_sample_times']
+    assert buffer.capacity == 10 ** 7
+    assert len(buffer.items) == len(buffer) < 10
+    p.finish()
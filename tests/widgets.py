@@ -70,6 +70,7 @@ def test_all_widgets_small_values():
         progressbar.Bar(),
         progressbar.ReverseBar(),
         progressbar.BouncingBar(),
+        progressbar.Sparkline(),
     ]
     p = progressbar.ProgressBar(widgets=widgets, max_value=10)
     for i in range(10):
@@ -95,6 +96,7 @@ def test_all_widgets_large_values():
         progressbar.Bar(fill=lambda progress, data, width: '#'),
         progressbar.ReverseBar(),
         progressbar.BouncingBar(),
+        progressbar.Sparkline(),
     ]
     p = progressbar.ProgressBar(widgets=widgets, max_value=10 ** 6)
     for i in range(0, 10 ** 6, 10 ** 4):
@@ -102,3 +104,125 @@ def test_all_widgets_large_values():
         p.update(i + 1)
     p.finish()
 
+
+def test_lazy_data():
+    p = progressbar.ProgressBar(max_value=10).start()
+    p.update(5)
+    data = p.data()
+
+    # Nothing is calculated before it's used
+    assert 'percentage' not in dict.keys(data)
+    assert 'percentage' in data
+    assert '%(percentage)d%%' % data == '50%'
+    assert 'percentage' in dict.keys(data)
+
+    # Copies and iteration include all variables
+    assert data.copy()['days_elapsed'] == 0
+    assert set(progressbar.bar.ProgressData.lazy_keys) <= set(data)
+    assert data.get('spam') is None
+    p.finish()
+
+
+def test_render_plan():
+    p = progressbar.ProgressBar(
+        widgets=['Test: ', progressbar.Percentage(), ' ', progressbar.Bar()],
+        max_value=10, term_width=40).start()
+    plan = p._get_render_plan()
+    assert plan.width == 40 - len('Test: ') - len(' ')
+    assert len(p._format_line()) == 40
+    assert p._get_render_plan() is plan
+
+    # Changing the width or widgets recompiles the plan
+    p.term_width = 60
+    assert len(p._format_line()) == 60
+    assert p._get_render_plan() is not plan
+
+    p.widgets = [progressbar.Bar()]
+    assert p._format_line() == '|' + ' ' * 58 + '|'
+    p.finish()
+
+
+def test_sparkline(fake_clock):
+    widget = progressbar.Sparkline(marks=' .:', buckets=5)
+    # Every update has to render to feed the history
+    p = progressbar.ProgressBar(widgets=[widget], max_value=100,
+                                term_width=8, line_mode=False).start()
+
+    value = 0
+    for speed in (2, 2, 2, 1, 0, 2, 2):
+        fake_clock.now += 1
+        value += speed
+        p.update(value, force=True)
+
+    # Only the last 5 periods are kept, the stall shows as a space
+    assert p._format_line() == '   :. ::'
+    # The history is the only state kept in the bar
+    assert len(p.extra) == 1
+    p.finish()
+
+
+def test_widget_depends():
+    calls = []
+
+    class Value(progressbar.widgets.WidgetBase):
+        depends = (('value', 10), 'finished')
+
+        def __call__(self, progress, data):
+            calls.append(data['value'])
+            return str(data['value'] // 10)
+
+    p = progressbar.ProgressBar(
+        widgets=[Value(), progressbar.Percentage(),
+                 progressbar.Percentage('%(percentage).1f')],
+        max_value=1000, term_width=20).start()
+    plan = p._get_render_plan()
+    assert sorted(plan.depends) == [0, 1]
+
+    for i in range(25):
+        p.value = i
+        p._format_widgets()
+    assert calls == [0, 1, 10, 20]
+
+    # Empty values are never mixed up with small values
+    p.value = 0
+    assert p._format_widgets()[1] == 'N/A%'
+    p.value = 1
+    assert p._format_widgets()[1] == '  0%'
+    p.finish()
+    assert calls[-1] == 1000
+
+
+def test_widget_depends_subclass():
+    '''Overriding `__call__` drops the inherited `depends`'''
+    class Elapsed(progressbar.Timer):
+        def __call__(self, progress, data):
+            return str(progress.value)
+
+    p = progressbar.ProgressBar(
+        widgets=[Elapsed(), progressbar.Timer(), progressbar.DataSize(),
+                 progressbar.ETA()],
+        max_value=1000, term_width=40).start()
+    assert sorted(p._get_render_plan().depends) == [1, 2]
+    p.finish()
+
+
+def test_smooth_bar():
+    widget = progressbar.SmoothBar(glyphs=' .:#')
+    p = progressbar.ProgressBar(widgets=[widget], max_value=60,
+                                term_width=12).start()
+    assert p._format_line() == '|          |'
+
+    # 10 characters with 3 steps each, so 2 values per step
+    p.value = 11
+    assert p._format_line() == '|#:        |'
+    p.value = 60
+    assert p._format_line() == '|##########|'
+    assert list(widget._tables) == [10]
+
+    # Every step of the bar should be able to trigger a redraw
+    p._set_update_interval()
+    assert p.num_intervals == 100
+    p.term_width = 40
+    p._set_update_interval()
+    assert p.num_intervals == 120
+    p.finish()